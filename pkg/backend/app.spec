@@ -34,6 +34,7 @@ all_datas += copy_metadata('safetensors')
 all_datas += [
     (frontend_path, 'frontend/build'),
     ('logging_utils.py', '.'),
+    ('metrics.py', '.'),
     ('config.py','.'),
     ('logo_transparent.png', '.'),
     *mpire_dashboard_templates,
@@ -1,5 +1,7 @@
 import os
 import json
+import time
+import threading
 from typing import Any, Dict
 from cryptography.fernet import Fernet
 
@@ -28,9 +30,17 @@ DEFAULT_CONFIG = {
 # Keys to leave as plain (not encrypted)
 PLAIN_KEYS = {"EMAIL_SMTP_PORT"}
 
+# How often (seconds) a cached read re-checks config.json's mtime for outside edits
+MTIME_CHECK_INTERVAL = 1.0
+
 class ConfigManager:
     def __init__(self):
         self._fernet = Fernet(STATIC_SECRET_KEY)
+        # Decrypted snapshot of config.json and the file mtime it was read at
+        self._cache = None
+        self._cache_mtime = None
+        self._last_mtime_check = 0.0
+        self._lock = threading.RLock()
         self._ensure_config_file()
 
     def _ensure_config_file(self):
@@ -65,36 +75,69 @@ class ConfigManager:
                 decrypted[key] = value
         return decrypted
 
-    def _load_config(self) -> Dict[str, Any]:
+    def _file_mtime(self):
+        try:
+            return os.stat(CONFIG_FILE_PATH).st_mtime_ns
+        except OSError:
+            return None
+
+    def _read_config(self) -> Dict[str, Any]:
         try:
             with open(CONFIG_FILE_PATH, 'r') as f:
                 raw_config = json.load(f)
         except (FileNotFoundError, json.JSONDecodeError):
             raw_config = DEFAULT_CONFIG.copy()
             self._save_config(raw_config)
+            return dict(raw_config)
         return self._decrypt_config(raw_config)
 
+    def _snapshot(self) -> Dict[str, Any]:
+        """The cached decrypted config, reloaded only when config.json changes on disk."""
+        cache = self._cache
+        now = time.monotonic()
+        if cache is not None and now - self._last_mtime_check < MTIME_CHECK_INTERVAL:
+            return cache
+        with self._lock:
+            mtime = self._file_mtime()
+            self._last_mtime_check = now
+            if self._cache is None or mtime != self._cache_mtime:
+                self._cache = self._read_config()
+                self._cache_mtime = self._file_mtime()
+            return self._cache
+
+    def _load_config(self) -> Dict[str, Any]:
+        return dict(self._snapshot())
+
     def _save_config(self, config: Dict[str, Any]):
         encrypted_config = self._encrypt_config(config)
-        with open(CONFIG_FILE_PATH, 'w') as f:
-            json.dump(encrypted_config, f, indent=4)
+        with self._lock:
+            with open(CONFIG_FILE_PATH, 'w') as f:
+                json.dump(encrypted_config, f, indent=4)
+            self._cache = dict(config)
+            self._cache_mtime = self._file_mtime()
+            self._last_mtime_check = time.monotonic()
+
+    def invalidate(self):
+        with self._lock:
+            self._cache = None
 
     def get_value(self, key: str) -> Any:
-        config = self._load_config()
-        return config.get(key)
+        return self._snapshot().get(key)
 
     def set_value(self, key: str, value: Any):
-        config = self._load_config()
-        config[key] = value
-        self._save_config(config)
+        with self._lock:
+            config = self._load_config()
+            config[key] = value
+            self._save_config(config)
 
     def get_all_config(self) -> Dict[str, Any]:
         return self._load_config()
 
     def update_multiple(self, updates: Dict[str, Any]):
-        config = self._load_config()
-        config.update(updates)
-        self._save_config(config)
+        with self._lock:
+            config = self._load_config()
+            config.update(updates)
+            self._save_config(config)
 
 
 # Global instance
@@ -1,11 +1,8 @@
-import os
-import json
-import pandas as pd
 from flask import Blueprint, request, jsonify
 from logging_utils import stage_log
+from . import report_store, chat_store
 
 CHATS_DIR = 'data/chats'
-REPORT_PATH = 'data/report.xlsx'
 
 admin_bp = Blueprint('admin', __name__)
 
@@ -17,12 +14,13 @@ def restrict_admin_routes():
 @admin_bp.route('/api/admin/chat_history/<uuid>', methods=['GET'])
 @stage_log(2)
 def get_chat_history(uuid):
-    chat_file = os.path.join(CHATS_DIR, f'{uuid}.json')
-    if not os.path.exists(chat_file):
-        return jsonify({'history': []})
-    with open(chat_file, 'r') as f:
-        chat_history = json.load(f)
-    return jsonify({'history': chat_history})
+    if request.args.get('limit') or request.args.get('cursor'):
+        try:
+            cursor, limit = chat_store.parse_page_args(request.args)
+        except ValueError:
+            return jsonify({'error': 'cursor and limit must be non-negative integers'}), 400
+        return jsonify(chat_store.get_messages(uuid, cursor, limit, CHATS_DIR))
+    return jsonify({'history': chat_store.get_history(uuid, CHATS_DIR)})
 
 @admin_bp.route('/api/admin/mark_lead', methods=['POST'])
 @stage_log(1)
@@ -33,17 +31,13 @@ def mark_lead():
     summary = data.get('summary')
     contact = data.get('contact', '')
 
-    if not os.path.exists(REPORT_PATH):
-        return jsonify({'error': 'No report found'}), 404
-
-    df = pd.read_excel(REPORT_PATH)
-    idx = df[df['ID'].astype(str) == str(uuid)].index
-    if not idx.empty:
-        df.at[idx[0], 'Status (Hot/Warm/Cold/Not Responded)'] = status
-        df.at[idx[0], 'Chat Summary'] = summary
-        if contact:
-            df.at[idx[0], 'Contact'] = contact
-        df.to_excel(REPORT_PATH, index=False)
+    updates = {
+        'Status (Hot/Warm/Cold/Not Responded)': status,
+        'Chat Summary': summary
+    }
+    if contact:
+        updates['Contact'] = contact
+    if report_store.update_entry(uuid, updates):
         return jsonify({'success': True})
     else:
         return jsonify({'error': 'Lead not found'}), 404
@@ -18,8 +18,8 @@ class ProductExtractorAgent:
         Returns:
             list: List of product names (strings).
         """
-        if self.llm is None:
-            self._initialize_components()
+        # Shared clients and collection handle, so this is cheap on every call
+        self._initialize_components()
         # Retrieve all documents from Chroma
         try:
             all_docs = self.company_collection.get()
@@ -1,108 +1,151 @@
-import pandas as pd
 from langchain_openai import AzureChatOpenAI, AzureOpenAIEmbeddings
-from langchain_chroma import Chroma
-from langchain.schema import HumanMessage
-import os
+import json
+import logging
+import traceback
+from concurrent.futures import ThreadPoolExecutor
 from logging_utils import stage_log
-from .chat_manager import ChatManager
+from .chat_manager import ChatManager, CONTEXT_QUERY_MESSAGES
 from .settings import setup_llm_and_embeddings
+from .vector_store import get_company_collection
+from .report_manager import assess_conversation
+from . import report_store, chat_store
 
+logger = logging.getLogger(__name__)
+
+# Post-reply work (rolling summary, conversation-end updates) gets its own small
+# pool so it never queues behind campaign or ingestion jobs
+BACKGROUND_WORKERS = 2
+_background_executor = ThreadPoolExecutor(max_workers=BACKGROUND_WORKERS,
+                                          thread_name_prefix="chat-background")
 
 def setup_company_collection(embeddings):
-    return Chroma(
-        collection_name="company_info_store",
-        persist_directory='data/chroma_store',
-        embedding_function=embeddings,
-        collection_metadata={"hnsw:space": "cosine"}
-    )
+    return get_company_collection(embeddings)
 
 def get_user_info(uuid):
-    REPORT_PATH = 'data/report.xlsx'
-    if not os.path.exists(REPORT_PATH):
-        return None
-    df = pd.read_excel(REPORT_PATH)
-    user_row = df[df['ID'].astype(str) == str(uuid)]
-    if user_row.empty:
+    entry = report_store.get_entry(uuid)
+    if not entry:
         return None
     return {
-        'name': user_row.iloc[0]['Name'],
-        'company': user_row.iloc[0]['Company'],
-        'email': user_row.iloc[0]['Email']
+        'name': entry['Name'],
+        'company': entry['Company'],
+        'email': entry['Email']
     }
 
 def update_report(uuid, chat_history, llm):
-    REPORT_PATH = 'data/report.xlsx'
-    if not os.path.exists(REPORT_PATH):
+    entry = report_store.get_entry(uuid)
+    if not entry:
         return False
         
-    # Generate summary
-    messages_content = [f"{msg['role']}: {msg['message']}" for msg in chat_history]
-    summary_prompt = f"Summarize this conversation in 50 words, including any contact details and key points discussed: {messages_content}"
-    summary_msg = HumanMessage(content=summary_prompt)
-    summary = llm.invoke([summary_msg]).content.strip()
+    # Summary and interest status come back from one structured call
+    summary, status = assess_conversation(llm, chat_history)
     
-    # Determine interest status
-    status_prompt = f"Based on this conversation {messages_content}, categorize interest as 'Hot' (very interested), 'Warm' (partially interested), or 'Cold' (not interested). Reply with one word only."
-    status_msg = HumanMessage(content=status_prompt)
-    status = llm.invoke([status_msg]).content.strip()
-    
-    # Update Excel file
-    df = pd.read_excel(REPORT_PATH)
-    mask = df['ID'].astype(str) == str(uuid)
-    if mask.any():
-        df.loc[mask, 'Chat Summary'] = summary
-        df.loc[mask, 'Status (Hot/Warm/Cold/Not Responded)'] = status
-        df.loc[mask, 'Connected'] = True
-        # Add new columns if not present
-        if 'Pending Meeting Email' not in df.columns:
-            df['Pending Meeting Email'] = ''
-        if 'Pending Meeting Info' not in df.columns:
-            df['Pending Meeting Info'] = ''
-        if 'Meeting Email Sent' not in df.columns:
-            df['Meeting Email Sent'] = ''
-        # If status is Hot and no pending meeting, auto-generate proposal
-        if status == 'Hot' and not df.loc[mask, 'Pending Meeting Email'].iloc[0]:
-            try:
-                from pkg.backend.app import orchestrate_meeting_flow
-            except ImportError:
-                from ..app import orchestrate_meeting_flow
-            lead_email = df.loc[mask, 'Email'].iloc[0]
-            lead_name = df.loc[mask, 'Name'].iloc[0]
-            result = orchestrate_meeting_flow(summary, lead_email, lead_name, send_email=False)
-            if result.get('success'):
-                # Compose email content for review
-                product = result.get('product', '')
-                responsible = result.get('responsible', {})
-                meeting_link = result.get('meeting_link', '')
-                slot = result.get('slot', '')
-                email_content = f"Hi {lead_name}, your meeting for {product} is scheduled with {responsible.get('name','')} at {slot}. Meeting Link: {meeting_link}"
-                df.loc[mask, 'Pending Meeting Email'] = email_content
-                import json
-                df.loc[mask, 'Pending Meeting Info'] = json.dumps(result)
-                df.loc[mask, 'Meeting Email Sent'] = 'No'
-        df.to_excel(REPORT_PATH, index=False)
-        return True
-    return False
+    updated = report_store.update_entry(uuid, {
+        'Chat Summary': summary,
+        'Status (Hot/Warm/Cold/Not Responded)': status,
+        'Connected': True
+    })
+    # If status is Hot and no pending meeting, auto-generate proposal
+    if updated and status == 'Hot' and not entry.get('Pending Meeting Email'):
+        # The assessment is already saved; a failed proposal only costs the proposal
+        try:
+            propose_meeting(uuid, entry, summary)
+        except Exception as e:
+            logger.warning(f"Meeting proposal failed for conversation {uuid}: {e}\n{traceback.format_exc()}")
+    return updated
+
+def propose_meeting(uuid, entry, summary):
+    # Imported here: the product extractor agent imports this module
+    from .meetings import orchestrate_meeting_flow
+    lead_email = entry['Email']
+    lead_name = entry['Name']
+    result = orchestrate_meeting_flow(summary, lead_email, lead_name, send_email=False)
+    if result.get('success'):
+        # Compose email content for review
+        product = result.get('product', '')
+        responsible = result.get('responsible', {})
+        meeting_link = result.get('meeting_link', '')
+        slot = result.get('slot', '')
+        email_content = f"Hi {lead_name}, your meeting for {product} is scheduled with {responsible.get('name','')} at {slot}. Meeting Link: {meeting_link}"
+        report_store.update_entry(uuid, {
+            'Pending Meeting Email': email_content,
+            'Pending Meeting Info': json.dumps(result),
+            'Meeting Email Sent': 'No'
+        })
 
-def generate_user_chat_response(uuid, chat_history):
+NOT_FOUND_MESSAGE = "Sorry, we couldn't find your information."
+
+def load_chat_window(uuid, chats_dir=None):
+    """
+    The part of a stored conversation a reply needs: every message the rolling
+    summary doesn't cover yet, and at least the last few for retrieval.
+    Returns (messages, start) where start is the index of the first message.
+    """
+    total = chat_store.count_messages(uuid, chats_dir)
+    state = ChatManager(None, None, None, chats_dir=chats_dir).load_summary(uuid)
+    covered = state['covered'] if state and state['covered'] <= total else 0
+    tail = chat_store.get_tail(uuid, max(total - covered, CONTEXT_QUERY_MESSAGES), chats_dir)
+    return tail['history'], tail['start']
+
+def _prepare_chat_messages(uuid, chat_history, start=0, chats_dir=None):
     user_info = get_user_info(uuid)
     if not user_info:
-        return "Sorry, we couldn't find your information."
+        return None, None
     
     llm, embeddings = setup_llm_and_embeddings()
     company_collection = setup_company_collection(embeddings)
     
-    chat_manager = ChatManager(llm, embeddings, company_collection)
-    messages = chat_manager.convert_to_messages(chat_history, user_info)
-    
-    response = llm.invoke(messages)
-    response_content = response.content
-    
+    chat_manager = ChatManager(llm, embeddings, company_collection, chats_dir=chats_dir)
+    return chat_manager, chat_manager.convert_to_messages(chat_history, user_info, uuid=uuid, start=start)
+
+def _fold_summary_in_background(chat_manager, uuid, chat_history, start):
+    try:
+        chat_manager.fold_summary(uuid, chat_history, start)
+    except Exception as e:
+        print(f"Failed to update rolling summary for conversation {uuid}: {e}\n{traceback.format_exc()}")
+
+def _update_report_in_background(uuid, chat_history, llm):
+    try:
+        update_report(uuid, chat_history, llm)
+    except Exception as e:
+        print(f"Failed to update report for conversation {uuid}: {e}\n{traceback.format_exc()}")
+
+def _finish_chat_turn(uuid, chat_history, response_content, chat_manager, start=0):
+    full_history = chat_history + [{"role": "ai", "message": response_content}]
+    _background_executor.submit(_fold_summary_in_background, chat_manager, uuid, full_history, start)
     # Check if conversation is ended
     if "have a great day" in response_content.lower():
-        # Update report with summary and status
-        update_report(uuid, chat_history + [
-            {"role": "ai", "message": response_content}
-        ], llm)
+        # Turns outside the window reach the assessment through the rolling summary
+        state = chat_manager.load_summary(uuid) if start else None
+        if state and state['summary']:
+            full_history = [{"role": "summary of earlier conversation", "message": state['summary']}] + full_history
+        # Summary, status and any meeting proposal run in the background so the reply returns now
+        _background_executor.submit(_update_report_in_background, uuid, full_history, chat_manager.llm)
+
+def generate_user_chat_response(uuid, chat_history, start=0, chats_dir=None):
+    """`chat_history` may be a window of the conversation beginning at message `start`."""
+    chat_manager, messages = _prepare_chat_messages(uuid, chat_history, start, chats_dir)
+    if chat_manager is None:
+        return NOT_FOUND_MESSAGE
+    
+    response = chat_manager.llm.invoke(messages)
+    response_content = response.content
+    _finish_chat_turn(uuid, chat_history, response_content, chat_manager, start)
+    return response_content
+
+def stream_user_chat_response(uuid, chat_history, start=0, chats_dir=None):
+    """
+    Yield the reply to the latest message token by token.
+    End-of-conversation handling runs once the stream is exhausted.
+    """
+    chat_manager, messages = _prepare_chat_messages(uuid, chat_history, start, chats_dir)
+    if chat_manager is None:
+        yield NOT_FOUND_MESSAGE
+        return
     
-    return response_content
\ No newline at end of file
+    parts = []
+    for chunk in chat_manager.llm.stream(messages):
+        token = chunk.content if hasattr(chunk, 'content') else str(chunk)
+        if token:
+            parts.append(token)
+            yield token
+    _finish_chat_turn(uuid, chat_history, "".join(parts), chat_manager, start)
\ No newline at end of file
@@ -1,14 +1,39 @@
-from langchain.schema import HumanMessage, AIMessage
+from langchain.schema import HumanMessage, AIMessage, SystemMessage
 from .chat_prompts import create_system_message
-from .report_manager import generate_chat_summary, determine_interest_status, ReportManager
+from .report_manager import assess_conversation, ReportManager
 import json
 import os
+import metrics
+from .chat_store import CHATS_DIR, conversation_lock
+from .vector_store import retrieve_company_chunks
+from .chunker import estimate_tokens
+
+# Most recent messages always replayed word for word
+RECENT_MESSAGES = 6
+# Rough budget for the summary plus replayed history in one request
+HISTORY_TOKEN_BUDGET = 2000
+SUMMARY_MAX_WORDS = 150
+# Messages that may pile up outside the verbatim window before they are summarized
+SUMMARY_FOLD_MESSAGES = 6
+# Company-info retrieval for the system prompt
+CONTEXT_TOP_K = 4
+CONTEXT_FETCH_K = 20
+CONTEXT_MMR_LAMBDA = 0.5
+CONTEXT_MIN_SCORE = 0.3
+CONTEXT_TOKEN_BUDGET = 1200
+# How many of the latest user messages make up the retrieval query
+CONTEXT_QUERY_MESSAGES = 3
+INITIAL_CONTEXT_QUERY = "company general information"
 
 class ChatManager:
-    def __init__(self, llm, embeddings, company_collection):
+    def __init__(self, llm, embeddings, company_collection,
+                 recent_messages=RECENT_MESSAGES, history_token_budget=HISTORY_TOKEN_BUDGET, chats_dir=None):
         self.llm = llm
+        self.chats_dir = chats_dir or CHATS_DIR
         self.embeddings = embeddings
         self.company_collection = company_collection
+        self.recent_messages = recent_messages
+        self.history_token_budget = history_token_budget
         
     def load_chat_history(self, chat_file):
         if os.path.exists(chat_file):
@@ -20,15 +45,30 @@ class ChatManager:
         with open(chat_file, 'w') as f:
             json.dump(chat_history, f, ensure_ascii=False, indent=2)
     
-    def convert_to_messages(self, chat_history, user_info=None):
+    def convert_to_messages(self, chat_history, user_info=None, uuid=None, start=0):
+        """
+        `chat_history` may be just the end of the conversation, starting at
+        message number `start`, as long as it includes every message the
+        rolling summary does not cover.
+        """
         messages = []
         
         # Add system message with context
         context = self._get_context(chat_history, user_info)
         messages.append(create_system_message(context))
         
+        # Turns already folded into the rolling summary are replaced by it; everything
+        # after them is replayed verbatim. No LLM call happens here: the summary is
+        # brought up to date after the reply, by fold_summary.
+        state = self.load_summary(uuid) if uuid else None
+        covered = start
+        if state and state['covered'] <= start + len(chat_history):
+            covered = max(state['covered'], start)
+            if state['summary']:
+                messages.append(SystemMessage(content=f"Summary of the earlier conversation:\n{state['summary']}"))
+        
         # Add chat history
-        for msg in chat_history:
+        for msg in chat_history[covered - start:]:
             if msg['role'] == 'user':
                 messages.append(HumanMessage(content=msg['message']))
             else:
@@ -36,6 +76,75 @@ class ChatManager:
                 
         return messages
     
+    def _select_recent(self, chat_history):
+        """Newest messages that fit the budget, at most recent_messages and never none."""
+        budget = self.history_token_budget - SUMMARY_MAX_WORDS * 2
+        selected = []
+        for msg in reversed(chat_history[-self.recent_messages:]):
+            cost = estimate_tokens(msg['message'])
+            if selected and cost > budget:
+                break
+            selected.append(msg)
+            budget -= cost
+        selected.reverse()
+        return selected
+    
+    def summary_file(self, uuid):
+        return os.path.join(self.chats_dir, f"{uuid}.summary.json")
+    
+    def load_summary(self, uuid):
+        """Persisted {'summary', 'covered'}, where covered is how many leading messages it replaces."""
+        path = self.summary_file(uuid)
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r') as f:
+            return json.load(f)
+    
+    def fold_summary(self, uuid, chat_history, start=0):
+        """
+        Fold messages that left the verbatim window into the rolling summary.
+        Runs after the reply has been sent, and only once the uncovered backlog
+        reaches SUMMARY_FOLD_MESSAGES or no longer fits the token budget, so
+        most turns make no summary call at all. Returns True if it folded.
+        """
+        state = self.load_summary(uuid) or {'summary': '', 'covered': 0}
+        end = start + len(chat_history)
+        if state['covered'] > end:
+            # History was reset or rewritten; start over
+            state = {'summary': '', 'covered': 0}
+        # Messages before `start` that the summary doesn't cover can't be folded in any more
+        covered = max(state['covered'], start)
+        fold_to = end - len(self._select_recent(chat_history))
+        backlog = chat_history[covered - start:max(fold_to - start, 0)]
+        uncovered_tokens = sum(estimate_tokens(msg['message']) for msg in chat_history[covered - start:])
+        if not backlog or (len(backlog) < SUMMARY_FOLD_MESSAGES
+                           and uncovered_tokens <= self.history_token_budget):
+            return False
+        
+        new_messages = [f"{msg['role']}: {msg['message']}" for msg in backlog]
+        prompt = (
+            f"Update the running summary of a sales chat with the new messages below. "
+            f"Keep names, contact details, stated problems, objections and commitments. "
+            f"Reply with the updated summary only, in at most {SUMMARY_MAX_WORDS} words.\n\n"
+            f"Current summary:\n{state['summary'] or '(none)'}\n\nNew messages:\n" + "\n".join(new_messages)
+        )
+        with metrics.track('llm', 'rolling_summary'):
+            summary = self.llm.invoke([HumanMessage(content=prompt)]).content.strip()
+        
+        path = self.summary_file(uuid)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Only the write is serialized; the next turn never waits on the LLM call above
+        with conversation_lock(uuid):
+            current = self.load_summary(uuid)
+            if current and end >= current['covered'] >= fold_to:
+                # A fold that started later already covers at least as much
+                return False
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump({'summary': summary, 'covered': fold_to}, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        return True
+    
     def _get_context(self, chat_history, user_info):
         context = ""
         
@@ -46,22 +155,50 @@ class ChatManager:
             context += f"Email: {user_info.get('email', 'Unknown')}\n\n"
         
         context += "<< COMPANY INFO >>\n"
-        if chat_history:
-            # Get relevant company info based on last message
-            search_results = self.company_collection.similarity_search(
-                chat_history[-1]['message'], k=1
-            )
-        else:
-            # Get general company info for initial message
-            search_results = self.company_collection.similarity_search(
-                "company general information", k=1
-            )
-            
-        if search_results:
-            context += search_results[0].page_content
+        context += "\n\n".join(self._retrieve_company_info(chat_history))
             
         return context
 
+    def _context_queries(self, chat_history):
+        # Short replies like "yes" only make sense with the turns before them
+        user_messages = [msg['message'] for msg in chat_history if msg['role'] == 'user']
+        if not user_messages:
+            # Get general company info for initial message
+            return [INITIAL_CONTEXT_QUERY]
+        return user_messages[-CONTEXT_QUERY_MESSAGES:]
+
+    def _embed_queries(self, texts):
+        embed_queries = getattr(self.embeddings, 'embed_queries', None)
+        if embed_queries:
+            return embed_queries(texts)
+        return [self.embeddings.embed_query(text) for text in texts]
+
+    def _context_vector(self, chat_history):
+        """
+        Mean of the vectors of the latest user messages. Each one is embedded
+        and cached on its own, so every earlier message is a cache hit and a
+        turn costs at most one embedding call, for the new message.
+        """
+        vectors = self._embed_queries(self._context_queries(chat_history))
+        return [sum(values) / len(vectors) for values in zip(*vectors)]
+
+    def _retrieve_company_info(self, chat_history):
+        """Chunks for the prompt, in rank order, packed into CONTEXT_TOKEN_BUDGET."""
+        query_vector = self._context_vector(chat_history)
+        results = retrieve_company_chunks(
+            self.company_collection, query_vector, k=CONTEXT_TOP_K, fetch_k=CONTEXT_FETCH_K,
+            lambda_mult=CONTEXT_MMR_LAMBDA, min_score=CONTEXT_MIN_SCORE
+        )
+        chunks = []
+        budget = CONTEXT_TOKEN_BUDGET
+        for doc, _ in results:
+            cost = estimate_tokens(doc.page_content)
+            if chunks and cost > budget:
+                continue
+            chunks.append(doc.page_content)
+            budget -= cost
+        return chunks
+
     # Add to existing ChatManager class
 
     def is_conversation_ended(self, message):
@@ -70,8 +207,7 @@ class ChatManager:
     
     def handle_conversation_end(self, uuid, chat_history):
         # Generate summary and status
-        summary = generate_chat_summary(self.llm, chat_history)
-        status = determine_interest_status(self.llm, chat_history)
+        summary, status = assess_conversation(self.llm, chat_history)
         
         # Update report
         report_manager = ReportManager()
@@ -0,0 +1,150 @@
+import json
+import os
+import threading
+from contextlib import contextmanager
+from itertools import islice
+
+CHATS_DIR = 'data/chats'
+MAX_PAGE_SIZE = 500
+TAIL_READ_BLOCK = 64 * 1024
+
+_locks = {}
+_locks_lock = threading.Lock()
+# Message count per log file, filled on first use and kept current by appends
+_counts = {}
+
+
+def _log_path(uuid, chats_dir=None):
+    return os.path.join(chats_dir or CHATS_DIR, f"{os.path.basename(str(uuid))}.jsonl")
+
+
+def _legacy_path(uuid, chats_dir=None):
+    return os.path.join(chats_dir or CHATS_DIR, f"{os.path.basename(str(uuid))}.json")
+
+
+def _lock_for(uuid):
+    with _locks_lock:
+        lock = _locks.get(uuid)
+        if lock is None:
+            lock = _locks[uuid] = threading.RLock()
+        return lock
+
+
+@contextmanager
+def conversation_lock(uuid):
+    """Serialize read-reply-append cycles on one conversation."""
+    lock = _lock_for(str(uuid))
+    with lock:
+        yield
+
+
+def _ensure_migrated(uuid, chats_dir=None):
+    """Rewrite a legacy whole-file JSON chat as a JSONL log, once."""
+    path = _log_path(uuid, chats_dir)
+    legacy_path = _legacy_path(uuid, chats_dir)
+    if os.path.exists(path) or not os.path.exists(legacy_path):
+        return path
+    with conversation_lock(uuid):
+        if not os.path.exists(path):
+            with open(legacy_path, 'r') as f:
+                messages = json.load(f)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'w') as f:
+                for msg in messages:
+                    f.write(json.dumps(msg, ensure_ascii=False) + "\n")
+            os.replace(tmp_path, path)
+            os.remove(legacy_path)
+    return path
+
+
+def exists(uuid, chats_dir=None) -> bool:
+    return os.path.exists(_ensure_migrated(uuid, chats_dir))
+
+
+def append_messages(uuid, messages: list, chats_dir=None):
+    """Append messages to the end of the conversation log."""
+    os.makedirs(chats_dir or CHATS_DIR, exist_ok=True)
+    path = _ensure_migrated(uuid, chats_dir)
+    payload = "".join(json.dumps(msg, ensure_ascii=False) + "\n" for msg in messages)
+    with conversation_lock(uuid):
+        with open(path, 'a') as f:
+            f.write(payload)
+        if path in _counts:
+            _counts[path] += len(messages)
+
+
+def count_messages(uuid, chats_dir=None) -> int:
+    """Number of messages in the conversation; the file is scanned only the first time."""
+    path = _ensure_migrated(uuid, chats_dir)
+    with conversation_lock(uuid):
+        if path not in _counts:
+            count = 0
+            if os.path.exists(path):
+                with open(path, 'rb') as f:
+                    for block in iter(lambda: f.read(TAIL_READ_BLOCK), b''):
+                        count += block.count(b'\n')
+            _counts[path] = count
+        return _counts[path]
+
+
+def get_tail(uuid, limit, chats_dir=None) -> dict:
+    """
+    The last `limit` messages, read backwards from the end of the log so the
+    cost depends on the tail, not the conversation length. `start` is the
+    index of the first returned message in the whole conversation.
+    """
+    path = _ensure_migrated(uuid, chats_dir)
+    total = count_messages(uuid, chats_dir)
+    limit = max(0, min(int(limit), total))
+    if not limit:
+        return {'history': [], 'start': total}
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        data = b''
+        # One extra newline marks the end of the line before the tail
+        while position > 0 and data.count(b'\n') <= limit:
+            step = min(TAIL_READ_BLOCK, position)
+            position -= step
+            f.seek(position)
+            data = f.read(step) + data
+    lines = [line for line in data.split(b'\n') if line.strip()][-limit:]
+    return {'history': [json.loads(line) for line in lines], 'start': total - len(lines)}
+
+
+def get_history(uuid, chats_dir=None) -> list:
+    """The whole conversation, oldest message first."""
+    return get_messages(uuid, chats_dir=chats_dir)['history']
+
+
+def parse_page_args(args):
+    """(cursor, limit) from query-string values; ValueError unless both are non-negative integers."""
+    cursor = int(args.get('cursor') or 0)
+    limit = args.get('limit')
+    limit = int(limit) if limit not in (None, '') else None
+    if cursor < 0 or (limit is not None and limit < 0):
+        raise ValueError("cursor and limit must be non-negative")
+    return cursor, limit
+
+
+def get_messages(uuid, cursor=0, limit=None, chats_dir=None) -> dict:
+    """
+    Page through a conversation in order. `cursor` is the index of the first
+    message to return; `next_cursor` is None once the end has been reached.
+    Lines outside the page are skipped without being decoded.
+    """
+    path = _ensure_migrated(uuid, chats_dir)
+    cursor = max(int(cursor or 0), 0)
+    if limit is not None:
+        limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+    if not os.path.exists(path):
+        return {'history': [], 'next_cursor': None}
+
+    with open(path, 'r') as f:
+        lines = islice(f, cursor, None if limit is None else cursor + limit + 1)
+        history = [json.loads(line) for line in lines if line.strip()]
+    next_cursor = None
+    if limit is not None and len(history) > limit:
+        history = history[:limit]
+        next_cursor = cursor + limit
+    return {'history': history, 'next_cursor': next_cursor}
@@ -0,0 +1,143 @@
+import re
+from langchain_core.documents import Document
+
+# Inserted between pages by the ingestion worker's markdown export
+PAGE_BREAK = "<!-- page break -->"
+CHUNK_TOKENS = 400
+CHUNK_OVERLAP_TOKENS = 60
+
+_HEADING = re.compile(r"^(#{1,6})\s+(.*\S)\s*$")
+_FENCE = re.compile(r"^\s*(```|~~~)")
+
+
+def estimate_tokens(text):
+    # ~4 characters per token for English; close enough for budgeting
+    return len(text) // 4 + 1
+
+
+def _sections(text):
+    """Yield (heading path, paragraphs) for each run of text under one heading."""
+    path = []
+    paragraphs = []
+    block = []
+
+    def flush_block():
+        if block:
+            paragraph = "\n".join(block).strip()
+            if paragraph:
+                paragraphs.append(paragraph)
+            block.clear()
+
+    fence = None
+    for line in text.splitlines():
+        marker = _FENCE.match(line)
+        if fence:
+            # Code blocks stay whole: no headings and no paragraph breaks inside
+            block.append(line)
+            if marker and marker.group(1) == fence:
+                fence = None
+            continue
+        if marker:
+            fence = marker.group(1)
+            block.append(line)
+            continue
+        heading = _HEADING.match(line)
+        if heading:
+            flush_block()
+            if paragraphs:
+                yield " > ".join(title for _, title in path), paragraphs
+                paragraphs = []
+            level = len(heading.group(1))
+            path = [(l, t) for l, t in path if l < level] + [(level, heading.group(2))]
+        elif not line.strip():
+            flush_block()
+        else:
+            block.append(line)
+    flush_block()
+    if paragraphs:
+        yield " > ".join(title for _, title in path), paragraphs
+
+
+def _split_long(paragraph, max_tokens, overlap_tokens):
+    """Word windows for a paragraph that doesn't fit in one chunk on its own."""
+    if estimate_tokens(paragraph) <= max_tokens:
+        return [paragraph]
+    words = paragraph.split()
+    # Budget in characters, converted back with the same 4:1 estimate
+    max_chars, overlap_chars = max_tokens * 4, overlap_tokens * 4
+    pieces = []
+    start = 0
+    while start < len(words):
+        end, size = start, 0
+        while end < len(words) and (end == start or size + len(words[end]) + 1 <= max_chars):
+            size += len(words[end]) + 1
+            end += 1
+        pieces.append(" ".join(words[start:end]))
+        if end >= len(words):
+            break
+        start = _tail_start(words, start, end, overlap_chars)
+    return pieces
+
+
+def _tail_start(words, start, end, overlap_chars):
+    """Index of the first word of the overlap carried over from words[start:end]."""
+    back, carried = end, 0
+    while back > start + 1 and carried + len(words[back - 1]) + 1 <= overlap_chars:
+        back -= 1
+        carried += len(words[back]) + 1
+    return back
+
+
+def _windows(paragraphs, max_tokens, overlap_tokens):
+    """Pack paragraphs into chunks of at most max_tokens, each starting with the previous one's last words."""
+    chunks = []
+    current, size = [], 0
+    for paragraph in paragraphs:
+        for piece in _split_long(paragraph, max_tokens, overlap_tokens):
+            cost = estimate_tokens(piece)
+            if current and size + cost > max_tokens:
+                chunks.append("\n\n".join(current))
+                # The last words of the chunk, however long its final paragraph
+                words = chunks[-1].split()
+                tail = " ".join(words[_tail_start(words, 0, len(words), overlap_tokens * 4):])
+                tail_size = estimate_tokens(tail)
+                if tail and tail_size + cost <= max_tokens:
+                    current, size = [tail], tail_size
+                else:
+                    current, size = [], 0
+            current.append(piece)
+            size += cost
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
+
+
+def chunk_markdown(text, page_number=1, max_tokens=CHUNK_TOKENS, overlap_tokens=CHUNK_OVERLAP_TOKENS):
+    """
+    Split markdown into retrieval-sized Documents.
+    Pages (separated by PAGE_BREAK) and headings are never merged into one
+    chunk; each chunk starts with its heading path so it reads on its own.
+    """
+    documents = []
+    for page_offset, page in enumerate(text.split(PAGE_BREAK)):
+        for section, paragraphs in _sections(page):
+            prefix = f"{section}\n\n" if section else ""
+            budget = max(max_tokens - estimate_tokens(prefix), overlap_tokens * 2)
+            for window in _windows(paragraphs, budget, overlap_tokens):
+                documents.append(Document(
+                    page_content=prefix + window,
+                    metadata={"page_number": page_number + page_offset, "section": section}
+                ))
+    return documents
+
+
+def chunk_content(content, max_tokens=CHUNK_TOKENS, overlap_tokens=CHUNK_OVERLAP_TOKENS):
+    """Chunk a markdown string or a list of page Documents (as produced for URLs)."""
+    if isinstance(content, str):
+        return chunk_markdown(content, max_tokens=max_tokens, overlap_tokens=overlap_tokens)
+    documents = []
+    for page in content:
+        if hasattr(page, "page_content"):
+            documents.extend(chunk_markdown(page.page_content, page.metadata.get("page_number", 1),
+                                            max_tokens, overlap_tokens))
+    return documents
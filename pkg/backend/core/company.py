@@ -1,82 +1,127 @@
 import os
 import tempfile
+import uuid
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
 # from docling import DoclingLoader
 # from langchain_docling.loader import ExportType
-from docling.document_converter import DocumentConverter
 from langchain_core.documents import Document
 from core.vector_store import get_company_collection, process_and_store_content
+from core.ingest_worker import init_worker, convert_file
 from core.utils import ensure_data_dir
 from logging_utils import stage_log
-import easyocr
 
 DATA_DIR = 'data/company_files'
+# Files converted by one worker process before it is replaced; this is what
+# bounds a worker's memory growth
+INGEST_TASKS_PER_WORKER = 4
+# Optional address-space cap per conversion worker (POSIX only). Off by default:
+# torch reserves far more virtual memory than it uses, so a cap low enough to
+# matter turns into MemoryError on ordinary documents.
+INGEST_WORKER_MEMORY_MB = 0
 
-@stage_log(1)
-def handle_company_files(files):
+def _ingest_workers():
+    return max(1, min(4, (os.cpu_count() or 2) // 2))
+
+@stage_log(2)
+def save_company_files(files):
+    """
+    Save uploads under DATA_DIR so they outlive the request. Each copy gets
+    a unique name, so queued uploads of the same file never share a path;
+    the original name is kept as 'file' and used as the source name.
+    Returns (accepted, rejected): accepted is a list of
+    {'file', 'path', 'type'} dicts, rejected a list of per-file results.
+    """
     ensure_data_dir(DATA_DIR)
-    company_collection = get_company_collection()
-    results = []
-    has_error = False
-    converter = DocumentConverter()
-    
+    accepted = []
+    rejected = []
     for file in files:
         try:
             ext = os.path.splitext(file.filename)[1].lower()
             if ext not in ['.pdf', '.doc', '.docx']:
-                results.append({
+                rejected.append({
                     'file': file.filename,
                     'status': 'error',
                     'error': 'Only PDF, DOC, and DOCX files are supported'
                 })
-                has_error = True
                 continue
-
-            file_path = os.path.join(DATA_DIR, file.filename)
+            file_path = os.path.join(DATA_DIR, f"{uuid.uuid4().hex}_{os.path.basename(file.filename)}")
             file.save(file_path)
-            
+            # Use the extension (without dot) as the type
+            accepted.append({'file': file.filename, 'path': file_path, 'type': ext[1:]})
+        except Exception as e:
+            rejected.append({
+                'file': file.filename,
+                'status': 'error',
+                'error': f"Upload error: {str(e)}"
+            })
+    return accepted, rejected
+
+@stage_log(1)
+def ingest_company_files(saved_files, rejected=None, progress_callback=None,
+                         workers=None, memory_limit_mb=INGEST_WORKER_MEMORY_MB):
+    """
+    Convert saved files in a pool of worker processes and store each one as
+    soon as its conversion finishes, so embedding overlaps with the
+    conversions still running. Every file's result is passed to
+    `progress_callback` when it is known.
+    """
+    company_collection = get_company_collection()
+    results = []
+    has_error = False
+
+    def record(entry):
+        results.append(entry)
+        if progress_callback:
+            progress_callback(entry)
+
+    for entry in rejected or []:
+        has_error = True
+        record(entry)
+    if not saved_files:
+        return {'success': not has_error, 'results': results}
+
+    executor = ProcessPoolExecutor(
+        max_workers=workers or _ingest_workers(),
+        # Spawned workers start clean; recycling them returns memory docling holds on to
+        mp_context=multiprocessing.get_context('spawn'),
+        max_tasks_per_child=INGEST_TASKS_PER_WORKER,
+        initializer=init_worker,
+        initargs=(memory_limit_mb,)
+    )
+    try:
+        futures = {executor.submit(convert_file, saved['path']): saved for saved in saved_files}
+        for future in as_completed(futures):
+            saved = futures[future]
             try:
-                result = converter.convert(file_path)
-                docs = result.document.export_to_markdown()
-                # docs = loader.load_and_split()
+                docs = future.result()
                 if not docs:
-                    raise Exception(f"No content could be extracted from the {ext.upper()} file")
-                
-                # Use the extension (without dot) as the type
-                file_type = ext[1:]
-                status = process_and_store_content(docs, company_collection, file_type, file.filename)
-                if status == 'error':
+                    raise Exception(f"No content could be extracted from the {saved['type'].upper()} file")
+                status = process_and_store_content(docs, company_collection, saved['type'], saved['file'])
+                if str(status).startswith('error'):
                     raise Exception("Failed to process and store content")
-                
-                results.append({
-                    'file': file.filename,
+                record({
+                    'file': saved['file'],
                     'status': 'success',
-                    'message': f'Successfully processed and stored content from {file.filename}'
+                    'message': f"Successfully processed and stored content from {saved['file']}"
                 })
-                
             except Exception as e:
-                results.append({
-                    'file': file.filename,
+                has_error = True
+                record({
+                    'file': saved['file'],
                     'status': 'error',
                     'error': f"Processing error: {str(e)}"
                 })
-                has_error = True
-                
             finally:
                 # Clean up the uploaded file
                 try:
-                    if os.path.exists(file_path):
-                        os.remove(file_path)
+                    if os.path.exists(saved['path']):
+                        os.remove(saved['path'])
                 except Exception as del_err:
-                    print(f"Warning: Could not delete uploaded company file {file_path}: {del_err}")
-                
-        except Exception as e:
-            results.append({
-                'file': file.filename,
-                'status': 'error',
-                'error': f"Upload error: {str(e)}"
-            })
-            has_error = True
-            
+                    print(f"Warning: Could not delete uploaded company file {saved['path']}: {del_err}")
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
     return {
         'success': not has_error,
         'results': results
@@ -111,7 +156,7 @@ def handle_company_urls(urls):
                 continue
                 
             status = process_and_store_content(docs, company_collection, 'url', url)
-            if status == 'error':
+            if str(status).startswith('error'):
                 results.append({
                     'url': url,
                     'status': 'error',
@@ -0,0 +1,123 @@
+import hashlib
+import os
+import re
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from langchain_core.embeddings import Embeddings
+from sqlalchemy import create_engine, Column, Float, String, LargeBinary
+from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.orm import sessionmaker
+import metrics
+
+Base = declarative_base()
+DB_PATH = 'sqlite:///data/embedding_cache.db'
+# Query vectors kept in memory, and on disk; the least recently used go first
+LRU_SIZE = 2048
+DISK_MAX_ROWS = 10000
+# Evicting down to this share of DISK_MAX_ROWS means most inserts delete nothing
+DISK_TRIM_RATIO = 0.9
+
+os.makedirs("data", exist_ok=True)
+
+
+class QueryEmbedding(Base):
+    __tablename__ = 'query_vector'
+    key = Column(String, primary_key=True)
+    deployment = Column(String, index=True)
+    # float32, half the size of a Python float and ample for cosine ranking
+    vector = Column(LargeBinary)
+    last_used = Column(Float, index=True)
+
+
+engine = create_engine(DB_PATH, echo=False)
+Base.metadata.create_all(engine)
+with engine.begin() as connection:
+    # Unbounded float64 table from before the size cap
+    connection.exec_driver_sql("DROP TABLE IF EXISTS query_embedding")
+Session = sessionmaker(bind=engine)
+
+
+def normalize_query(text) -> str:
+    return re.sub(r"\s+", " ", str(text)).strip().lower()
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings client that remembers query vectors, keyed by the normalized
+    text and the embedding deployment. Lookups go to an in-memory LRU first,
+    then to data/embedding_cache.db, and only then to the wrapped client.
+    The file keeps at most `disk_max_rows` vectors. Normalization only
+    shapes the key; the client always embeds the text as written.
+    Document embeddings (ingestion) are passed straight through.
+    """
+    def __init__(self, inner, deployment, lru_size=LRU_SIZE, disk_max_rows=DISK_MAX_ROWS):
+        self.inner = inner
+        self.deployment = deployment or ''
+        self.lru_size = lru_size
+        self.disk_max_rows = disk_max_rows
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _key(self, text):
+        return hashlib.sha256(f"{self.deployment}\n{normalize_query(text)}".encode()).hexdigest()
+
+    def _remember(self, key, vector):
+        with self._lock:
+            self._lru[key] = vector
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.lru_size:
+                self._lru.popitem(last=False)
+
+    def embed_query(self, text):
+        return self.embed_queries([text])[0]
+
+    def embed_queries(self, texts):
+        """Vectors for several queries; all misses go to the client in one call."""
+        keys = [self._key(text) for text in texts]
+        vectors = {}
+        with self._lock:
+            for key in keys:
+                if key in self._lru:
+                    self._lru.move_to_end(key)
+                    vectors[key] = self._lru[key]
+        missing = [key for key in dict.fromkeys(keys) if key not in vectors]
+        if missing:
+            with Session() as session:
+                for row in session.query(QueryEmbedding).filter(QueryEmbedding.key.in_(missing)):
+                    vectors[row.key] = array('f', row.vector).tolist()
+                    self._remember(row.key, vectors[row.key])
+                    row.last_used = time.time()
+                session.commit()
+
+        to_embed = {}
+        for key, text in zip(keys, texts):
+            if key not in vectors:
+                to_embed.setdefault(key, text)
+        if to_embed:
+            with metrics.track('embedding', 'embed_query'):
+                embedded = self.inner.embed_documents(list(to_embed.values()))
+            now = time.time()
+            with Session() as session:
+                for key, vector in zip(to_embed, embedded):
+                    vectors[key] = list(vector)
+                    self._remember(key, vectors[key])
+                    session.merge(QueryEmbedding(key=key, deployment=self.deployment,
+                                                 vector=array('f', vector).tobytes(), last_used=now))
+                session.commit()
+                self._trim(session)
+        return [vectors[key] for key in keys]
+
+    def _trim(self, session):
+        """Drop the least recently used rows once the file holds more than disk_max_rows."""
+        if session.query(QueryEmbedding.key).count() <= self.disk_max_rows:
+            return
+        keep = int(self.disk_max_rows * DISK_TRIM_RATIO)
+        cutoff = (session.query(QueryEmbedding.last_used).order_by(QueryEmbedding.last_used.desc())
+                  .offset(keep).limit(1).scalar())
+        session.query(QueryEmbedding).filter(QueryEmbedding.last_used <= cutoff).delete(synchronize_session=False)
+        session.commit()
+
+    def embed_documents(self, texts):
+        return self.inner.embed_documents(texts)
@@ -0,0 +1,125 @@
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from logging_utils import stage_log
+import metrics
+from core.chunker import estimate_tokens
+from core.utils import RateLimiter
+
+EMBED_BATCH_SIZE = 64
+# Azure rejects embedding requests much above this many tokens in total
+EMBED_BATCH_TOKENS = 8000
+EMBED_CONCURRENCY = 2
+EMBED_REQUESTS_PER_MINUTE = 120
+EMBED_MAX_RETRIES = 5
+EMBED_BACKOFF_SECONDS = 1.0
+
+RETRYABLE_STATUS = (408, 429, 500, 502, 503, 504)
+RETRYABLE_ERRORS = ('RateLimitError', 'APIConnectionError', 'APITimeoutError', 'InternalServerError')
+
+
+def is_retryable(error):
+    status = getattr(error, 'status_code', None) or getattr(getattr(error, 'response', None), 'status_code', None)
+    return status in RETRYABLE_STATUS or type(error).__name__ in RETRYABLE_ERRORS
+
+
+def make_batches(items, batch_size=EMBED_BATCH_SIZE, batch_tokens=EMBED_BATCH_TOKENS):
+    """Group (id, Document) pairs by count and by estimated tokens, keeping order."""
+    batches = []
+    current, tokens = [], 0
+    for item in items:
+        cost = estimate_tokens(item[1].page_content)
+        if current and (len(current) >= batch_size or tokens + cost > batch_tokens):
+            batches.append(current)
+            current, tokens = [], 0
+        current.append(item)
+        tokens += cost
+    if current:
+        batches.append(current)
+    return batches
+
+
+def _embed_with_backoff(embeddings, texts, limiter, max_retries, backoff_seconds):
+    for attempt in range(max_retries + 1):
+        limiter.wait()
+        try:
+            with metrics.track('embedding', 'embed_documents'):
+                return embeddings.embed_documents(texts)
+        except Exception as e:
+            if attempt >= max_retries or not is_retryable(e):
+                raise
+            # Exponential backoff with jitter so concurrent batches don't retry in lockstep
+            time.sleep(backoff_seconds * (2 ** attempt) * (0.5 + random.random() / 2))
+
+
+def _native_collection(collection):
+    # langchain_chroma has no public call that stores precomputed vectors (add_texts always
+    # re-embeds), so batches we embedded ourselves go to the underlying chromadb collection.
+    # This is the only place that reaches past the wrapper.
+    return collection._collection
+
+
+def _upsert(collection, batch, vectors):
+    with metrics.track('chroma', 'upsert'):
+        _native_collection(collection).upsert(
+            ids=[chunk_id for chunk_id, _ in batch],
+            embeddings=[list(vector) for vector in vectors],
+            documents=[doc.page_content for _, doc in batch],
+            metadatas=[doc.metadata for _, doc in batch]
+        )
+
+
+@stage_log(2)
+def write_chunks(collection, ids, documents, known_vectors=None, batch_size=EMBED_BATCH_SIZE,
+                 batch_tokens=EMBED_BATCH_TOKENS, concurrency=EMBED_CONCURRENCY,
+                 requests_per_minute=EMBED_REQUESTS_PER_MINUTE, max_retries=EMBED_MAX_RETRIES,
+                 backoff_seconds=EMBED_BACKOFF_SECONDS):
+    """
+    Embed and store chunks in batches, several in flight at once.
+    Each batch is committed to the collection as soon as it is embedded, and
+    IDs already present are skipped, so rerunning an interrupted ingestion
+    picks up after the last committed batch. Chunks whose ID is in
+    `known_vectors` are stored with that vector and never sent for embedding.
+    Returns {'written', 'reused', 'skipped'}; raises if a batch fails for good.
+    """
+    if not ids:
+        return {'written': 0, 'reused': 0, 'skipped': 0}
+    known_vectors = known_vectors or {}
+    existing = set(collection.get(ids=list(ids), include=[])['ids'])
+    pending = [(chunk_id, doc) for chunk_id, doc in zip(ids, documents) if chunk_id not in existing]
+    reused = [(chunk_id, doc) for chunk_id, doc in pending if chunk_id in known_vectors]
+    for start in range(0, len(reused), batch_size):
+        batch = reused[start:start + batch_size]
+        _upsert(collection, batch, [known_vectors[chunk_id] for chunk_id, _ in batch])
+    batches = make_batches([item for item in pending if item[0] not in known_vectors], batch_size, batch_tokens)
+    embeddings = collection.embeddings
+    limiter = RateLimiter(requests_per_minute)
+
+    written = 0
+    pool = ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="embed")
+    try:
+        futures = {
+            pool.submit(_embed_with_backoff, embeddings, [doc.page_content for _, doc in batch],
+                        limiter, max_retries, backoff_seconds): batch
+            for batch in batches
+        }
+        failure = None
+        for future in as_completed(futures):
+            batch = futures[future]
+            try:
+                vectors = future.result()
+            except Exception as e:
+                # Keep storing the batches that do finish, so a rerun has less to redo
+                if failure is None:
+                    failure = e
+                    for pending_future in futures:
+                        pending_future.cancel()
+                continue
+            # Writes stay on this thread; only the embedding calls overlap
+            _upsert(collection, batch, vectors)
+            written += len(batch)
+        if failure is not None:
+            raise failure
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+    return {'written': written + len(reused), 'reused': len(reused), 'skipped': len(existing)}
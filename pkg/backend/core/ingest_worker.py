@@ -0,0 +1,32 @@
+"""
+Document conversion run inside ingestion worker processes.
+Kept free of Flask, Chroma and LLM imports so each worker starts with only
+what docling needs.
+"""
+from core.chunker import PAGE_BREAK
+
+_converter = None
+
+
+def init_worker(memory_limit_mb=None):
+    """Cap the worker's address space where the platform supports it, if asked to."""
+    if not memory_limit_mb:
+        return
+    try:
+        import resource
+        limit = int(memory_limit_mb) * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    except (ImportError, ValueError, OSError):
+        # No rlimits on Windows; workers are still recycled after a few files
+        pass
+
+
+def convert_file(file_path):
+    """Convert one PDF/DOC/DOCX to markdown with this worker's converter."""
+    global _converter
+    if _converter is None:
+        from docling.document_converter import DocumentConverter
+        _converter = DocumentConverter()
+    result = _converter.convert(file_path)
+    # Page markers let the chunker keep page numbers
+    return result.document.export_to_markdown(page_break_placeholder=PAGE_BREAK)
@@ -0,0 +1,198 @@
+import json
+import os
+import threading
+import time
+import traceback
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from logging_utils import stage_log
+
+JOBS_DIR = 'data/jobs'
+JOB_WORKERS = 2
+# Progress is written to disk every this many results, or after this many seconds
+PERSIST_EVERY = 25
+PERSIST_INTERVAL_SECONDS = 2.0
+# Finished jobs kept in memory; older ones are read back from their snapshot
+MAX_FINISHED_IN_MEMORY = 50
+# Snapshots of finished jobs are deleted after this long
+JOB_RETENTION_DAYS = 7
+PRUNE_INTERVAL_SECONDS = 3600
+
+_executor = None
+_executor_lock = threading.Lock()
+# Jobs started by this process; anything else on disk is read back as a snapshot
+_jobs = {}
+_jobs_lock = threading.Lock()
+_finished = deque()
+# Serializes file writes per job; a job's updates all come from its own worker thread
+_write_locks = {}
+_last_prune = 0.0
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix="job")
+        return _executor
+
+
+def _job_path(job_id):
+    return os.path.join(JOBS_DIR, f"{job_id}.json")
+
+
+def _now():
+    return datetime.now().isoformat(timespec='seconds')
+
+
+def _persist(job_id, snapshot):
+    """Write the job snapshot atomically so readers never see a half-written file."""
+    os.makedirs(JOBS_DIR, exist_ok=True)
+    path = _job_path(job_id)
+    tmp_path = f"{path}.tmp"
+    with _write_locks[job_id]:
+        with open(tmp_path, 'w') as f:
+            f.write(snapshot)
+        os.replace(tmp_path, path)
+
+
+def _snapshot(job):
+    # Serialized under _jobs_lock; the file write happens after it is released
+    return json.dumps(job, ensure_ascii=False, default=str)
+
+
+def _update(job_id, **fields):
+    with _jobs_lock:
+        job = _jobs[job_id]
+        job.update(fields)
+        job['updated_at'] = _now()
+        snapshot = _snapshot(job)
+    _persist(job_id, snapshot)
+
+
+def _finish(job_id, **fields):
+    _update(job_id, **fields)
+    with _jobs_lock:
+        _finished.append(job_id)
+        while len(_finished) > MAX_FINISHED_IN_MEMORY:
+            evicted = _finished.popleft()
+            _jobs.pop(evicted, None)
+            _write_locks.pop(evicted, None)
+
+
+def _run(job_id, func, args, kwargs):
+    _update(job_id, status='running', started_at=_now())
+    last_persist = [time.monotonic(), 0]
+
+    def progress(entry):
+        with _jobs_lock:
+            job = _jobs[job_id]
+            job['results'].append(entry)
+            job['processed'] = len(job['results'])
+            job['updated_at'] = _now()
+            due = (job['processed'] - last_persist[1] >= PERSIST_EVERY
+                   or time.monotonic() - last_persist[0] >= PERSIST_INTERVAL_SECONDS)
+            if due:
+                last_persist[:] = [time.monotonic(), job['processed']]
+                snapshot = _snapshot(job)
+        if due:
+            _persist(job_id, snapshot)
+
+    try:
+        result = func(*args, progress_callback=progress, **kwargs)
+        status = 'completed' if not isinstance(result, dict) or result.get('success', True) else 'failed'
+        fields = {'status': status, 'finished_at': _now(), 'result': result}
+        if isinstance(result, dict):
+            if 'results' in result:
+                fields['processed'] = len(result['results'])
+                # The final list is in `result`; keeping the running copy too would double every snapshot
+                with _jobs_lock:
+                    _jobs[job_id].pop('results', None)
+            if result.get('error'):
+                fields['error'] = result['error']
+        _finish(job_id, **fields)
+    except Exception as e:
+        print(f"Job {job_id} failed: {e}\n{traceback.format_exc()}")
+        _finish(job_id, status='failed', finished_at=_now(), error=str(e))
+
+
+def prune_jobs(retention_days=JOB_RETENTION_DAYS):
+    """Delete snapshots of jobs not touched for `retention_days`; returns how many went."""
+    if not os.path.isdir(JOBS_DIR):
+        return 0
+    cutoff = time.time() - retention_days * 86400
+    with _jobs_lock:
+        active = set(_jobs)
+    removed = 0
+    for name in os.listdir(JOBS_DIR):
+        path = os.path.join(JOBS_DIR, name)
+        job_id = name.split('.', 1)[0]
+        try:
+            if job_id not in active and os.path.getmtime(path) < cutoff:
+                os.remove(path)
+                removed += 1
+        except OSError:
+            pass
+    return removed
+
+
+def _maybe_prune():
+    global _last_prune
+    now = time.monotonic()
+    if _last_prune and now - _last_prune < PRUNE_INTERVAL_SECONDS:
+        return
+    _last_prune = now
+    try:
+        prune_jobs()
+    except Exception as e:
+        print(f"Warning: Could not prune old jobs: {e}")
+
+
+@stage_log(2)
+def submit_job(job_type, func, *args, total=None, **kwargs):
+    """
+    Queue `func(*args, progress_callback=..., **kwargs)` on the worker pool.
+    The callback takes one per-item result dict; progress is persisted under
+    data/jobs so it can be polled through get_job. Returns the job ID.
+    """
+    job_id = str(uuid.uuid4())
+    job = {
+        'id': job_id,
+        'type': job_type,
+        'status': 'queued',
+        'created_at': _now(),
+        'updated_at': _now(),
+        'started_at': None,
+        'finished_at': None,
+        'total': total,
+        'processed': 0,
+        'results': [],
+        'result': None,
+        'error': None
+    }
+    _maybe_prune()
+    with _jobs_lock:
+        _jobs[job_id] = job
+        _write_locks[job_id] = threading.Lock()
+        snapshot = _snapshot(job)
+    _persist(job_id, snapshot)
+    _get_executor().submit(_run, job_id, func, args, kwargs)
+    return job_id
+
+
+def get_job(job_id):
+    """Return a job snapshot, or None if the ID is unknown."""
+    with _jobs_lock:
+        if job_id in _jobs:
+            return json.loads(json.dumps(_jobs[job_id], default=str))
+    path = _job_path(os.path.basename(job_id))
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r') as f:
+        job = json.load(f)
+    # Left unfinished by a previous process; it will never complete now
+    if job.get('status') in ('queued', 'running'):
+        job['status'] = 'interrupted'
+    return job
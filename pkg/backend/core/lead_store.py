@@ -0,0 +1,278 @@
+import json
+import os
+import threading
+import pandas as pd
+from sqlalchemy import create_engine, select, func, case, or_, Column, Integer, String, Text, DateTime
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.orm import sessionmaker
+
+Base = declarative_base()
+DB_PATH = 'sqlite:///data/leads.db'
+LEGACY_MASTER_PATH = 'data/master_leads.xlsx'
+# Older SQLite builds cap a statement at 999 bound parameters
+BATCH_SIZE = 100
+
+os.makedirs("data", exist_ok=True)
+
+# Spreadsheet column -> Lead attribute
+COLUMN_MAP = {
+    'ID': 'lead_id',
+    'Name': 'name',
+    'Company': 'company',
+    'Email': 'email',
+    'Description': 'description',
+    'source': 'source',
+    'email_count': 'email_count',
+    'Last Email Sent': 'last_email_sent',
+}
+COLUMN_ALIASES = {'Email Sent Count': 'email_count'}
+# Lead attribute -> key in the /api/leads payload
+API_FIELDS = {
+    'lead_id': 'id',
+    'name': 'name',
+    'company': 'company',
+    'email': 'email',
+    'description': 'description',
+    'source': 'source',
+    'email_count': 'email_count',
+    'last_email_sent': 'last_email_sent',
+}
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+class Lead(Base):
+    __tablename__ = 'lead'
+    id = Column(Integer, primary_key=True)
+    lead_id = Column(String, unique=True, index=True, nullable=False)
+    name = Column(String)
+    company = Column(String)
+    email = Column(String, index=True)
+    description = Column(Text)
+    source = Column(String, index=True)
+    email_count = Column(Integer, default=0, nullable=False)
+    last_email_sent = Column(DateTime, index=True)
+    # Any other spreadsheet columns, kept as JSON so exports round-trip
+    extra = Column(Text)
+
+
+engine = create_engine(DB_PATH, echo=False)
+Base.metadata.create_all(engine)
+Session = sessionmaker(bind=engine)
+
+_migration_lock = threading.Lock()
+_migrated = False
+
+
+def _ensure_migrated():
+    """Import the legacy master workbook once, the first time the store is empty."""
+    global _migrated
+    if _migrated:
+        return
+    with _migration_lock:
+        if _migrated:
+            return
+        with Session() as session:
+            empty = session.query(Lead.id).first() is None
+        if empty and os.path.exists(LEGACY_MASTER_PATH):
+            _upsert_frame(pd.read_excel(LEGACY_MASTER_PATH))
+        _migrated = True
+
+
+def _chunks(items, size=BATCH_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _frame_to_rows(df: pd.DataFrame) -> list:
+    if 'email_count' in df.columns:
+        df = df.drop(columns=list(COLUMN_ALIASES), errors='ignore')
+    df = df.rename(columns=COLUMN_ALIASES)
+    df = df.drop_duplicates(subset=['ID'], keep='last')
+
+    out = pd.DataFrame(index=df.index)
+    out['lead_id'] = df['ID'].astype(str)
+    for column in ('Name', 'Company', 'Email', 'Description', 'source'):
+        out[COLUMN_MAP[column]] = df[column].astype(object) if column in df.columns else None
+    if 'email_count' in df.columns:
+        out['email_count'] = pd.to_numeric(df['email_count'], errors='coerce').fillna(0).astype(int)
+    else:
+        out['email_count'] = 0
+    if 'Last Email Sent' in df.columns:
+        out['last_email_sent'] = pd.to_datetime(df['Last Email Sent'], errors='coerce')
+    else:
+        out['last_email_sent'] = None
+
+    extra_columns = [c for c in df.columns if c not in COLUMN_MAP]
+    if extra_columns:
+        extra = df[extra_columns].astype(object).where(df[extra_columns].notna(), None)
+        out['extra'] = [json.dumps(r, default=str) for r in extra.to_dict(orient='records')]
+    else:
+        out['extra'] = None
+
+    out = out.astype(object).where(out.notna(), None)
+    return out.to_dict(orient='records')
+
+
+def _upsert_frame(df: pd.DataFrame) -> int:
+    rows = _frame_to_rows(df)
+    if not rows:
+        return 0
+    with Session() as session:
+        for batch in _chunks(rows):
+            stmt = sqlite_insert(Lead).values(batch)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[Lead.lead_id],
+                set_={key: stmt.excluded[key] for key in batch[0] if key != 'lead_id'}
+            )
+            session.execute(stmt)
+        session.commit()
+    return len(rows)
+
+
+def _frame_columns():
+    return [getattr(Lead, attr) for attr in COLUMN_MAP.values()] + [Lead.extra]
+
+
+def _rows_to_frame(rows) -> pd.DataFrame:
+    """Build a spreadsheet-shaped frame column-wise from (COLUMN_MAP..., extra) tuples."""
+    df = pd.DataFrame(rows, columns=list(COLUMN_MAP) + ['extra'])
+    extras = df.pop('extra')
+    if extras.notna().any():
+        extra_df = pd.DataFrame([json.loads(e) if e else {} for e in extras], index=df.index)
+        extra_df = extra_df.drop(columns=[c for c in extra_df.columns if c in df.columns])
+        df = df.join(extra_df)
+    return df
+
+
+def upsert_leads(df: pd.DataFrame) -> int:
+    """Insert or replace leads keyed by ID; later rows win, like the old master merge."""
+    _ensure_migrated()
+    return _upsert_frame(df)
+
+
+def get_leads_frame(lead_ids=None) -> pd.DataFrame:
+    """Return the requested leads (or all of them) with the spreadsheet column names."""
+    _ensure_migrated()
+    with Session() as session:
+        if lead_ids is None:
+            rows = session.execute(select(*_frame_columns()).order_by(Lead.id)).all()
+        else:
+            keys = list(dict.fromkeys(str(i) for i in lead_ids))
+            rows = []
+            for batch in _chunks(keys):
+                rows.extend(session.execute(
+                    select(Lead.id, *_frame_columns()).where(Lead.lead_id.in_(batch))
+                ).all())
+            rows = [row[1:] for row in sorted(rows, key=lambda row: row[0])]
+    return _rows_to_frame(rows)
+
+
+def _api_frame(rows) -> pd.DataFrame:
+    df = pd.DataFrame(rows, columns=list(API_FIELDS.values()))
+    df['source'] = df['source'].fillna('Unknown')
+    sent = pd.to_datetime(df['last_email_sent'])
+    df['last_email_sent'] = sent.astype(str).where(sent.notna(), '')
+    return df.astype(object).where(df.notna(), None)
+
+
+def _api_columns():
+    return [getattr(Lead, attr) for attr in API_FIELDS]
+
+
+def get_grouped_leads() -> dict:
+    _ensure_migrated()
+    with Session() as session:
+        rows = session.execute(select(*_api_columns()).order_by(Lead.id)).all()
+    df = _api_frame(rows)
+    return {src: group.to_dict(orient='records') for src, group in df.groupby('source', sort=False)}
+
+
+def query_leads(cursor=None, limit=DEFAULT_PAGE_SIZE, source=None, min_email_count=None,
+                max_email_count=None, sent_after=None, sent_before=None, search=None) -> dict:
+    """
+    One page of leads in insertion order, keyset-paginated on the row id.
+    Pass the returned next_cursor back as `cursor` to continue; it is None on the last page.
+    `search` keeps leads whose name, email or company contains every word of it.
+    """
+    _ensure_migrated()
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+    stmt = select(Lead.id, *_api_columns()).order_by(Lead.id).limit(limit + 1)
+    if cursor:
+        stmt = stmt.where(Lead.id > int(cursor))
+    if source is not None:
+        stmt = stmt.where(Lead.source.is_(None) if source == 'Unknown' else Lead.source == source)
+    if min_email_count is not None:
+        stmt = stmt.where(Lead.email_count >= min_email_count)
+    if max_email_count is not None:
+        stmt = stmt.where(Lead.email_count <= max_email_count)
+    if sent_after is not None:
+        stmt = stmt.where(Lead.last_email_sent >= sent_after)
+    if sent_before is not None:
+        stmt = stmt.where(Lead.last_email_sent < sent_before)
+    # SQLite's LIKE ignores ASCII case; autoescape keeps % and _ in a term literal
+    for term in (search or '').split():
+        stmt = stmt.where(or_(*(column.contains(term, autoescape=True)
+                                for column in (Lead.name, Lead.email, Lead.company))))
+    with Session() as session:
+        rows = session.execute(stmt).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    return {
+        'leads': _api_frame([row[1:] for row in rows]).to_dict(orient='records'),
+        'next_cursor': str(rows[-1][0]) if has_more else None
+    }
+
+
+def get_source_summary() -> list:
+    """Lead counts per source, computed by the database."""
+    _ensure_migrated()
+    stmt = select(
+        Lead.source,
+        func.count(Lead.id),
+        func.sum(case((Lead.email_count > 0, 1), else_=0)),
+        func.max(Lead.last_email_sent)
+    ).group_by(Lead.source).order_by(func.min(Lead.id))
+    with Session() as session:
+        rows = session.execute(stmt).all()
+    return [{
+        'source': src if src is not None else 'Unknown',
+        'total': total,
+        'contacted': int(contacted or 0),
+        'last_email_sent': str(last_sent) if last_sent else ''
+    } for src, total, contacted, last_sent in rows]
+
+
+def record_emails_sent(lead_ids, sent_at) -> int:
+    """Bump email_count and stamp Last Email Sent for the given leads."""
+    _ensure_migrated()
+    keys = [str(i) for i in lead_ids]
+    updated = 0
+    with Session() as session:
+        for batch in _chunks(keys):
+            updated += session.query(Lead).filter(Lead.lead_id.in_(batch)).update(
+                {Lead.email_count: Lead.email_count + 1, Lead.last_email_sent: sent_at},
+                synchronize_session=False
+            )
+        session.commit()
+    return updated
+
+
+def import_leads(path: str) -> int:
+    """Load an .xlsx or .csv lead sheet into the store."""
+    if path.endswith('.csv'):
+        df = pd.read_csv(path)
+    else:
+        df = pd.read_excel(path)
+    return upsert_leads(df)
+
+
+def export_leads(path: str = LEGACY_MASTER_PATH) -> str:
+    """Write every lead to an .xlsx or .csv file in the old master layout."""
+    df = get_leads_frame()
+    if path.endswith('.csv'):
+        df.to_csv(path, index=False)
+    else:
+        df.to_excel(path, index=False)
+    return path
@@ -1,67 +1,95 @@
 import os
 import pandas as pd
-from datetime import datetime, timedelta
+from datetime import datetime
 from dotenv import load_dotenv
 from langchain_openai import AzureChatOpenAI, AzureOpenAIEmbeddings
-from langchain_chroma import Chroma
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-import smtplib
+import threading
 import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
 # from core.settings import load_and_set_decrypted_env
 from logging_utils import stage_log
 import config
+import metrics
 from core.settings import setup_llm_and_embeddings
+from core.vector_store import get_company_collection, get_collection_version
+from core.mailer import SMTPSession
+from core.utils import RateLimiter
+from core import lead_store, report_store
 
 # Ensure decrypted credentials are loaded into os.environ
 # load_and_set_decrypted_env()
 
-MASTER_PATH = 'data/master_leads.xlsx'
 REPORT_PATH = 'data/report.xlsx'
 COOLDOWN_HOURS = 5
-PERSIST_DIRECTORY = 'data/chroma_store'
+EMAIL_SUBJECT = "Invitation to Chat with Caze BizConAI"
+# Outreach pipeline limits for the LLM generation stage
+LLM_CONCURRENCY = 4
+LLM_REQUESTS_PER_MINUTE = 60
+# 'batch' retrieves one company context per campaign; 'per_lead' matches each lead's Company/Description
+EMAIL_RETRIEVAL_MODE = 'batch'
+EMAIL_CONTEXT_QUERY = "company information and user information, company information more related to the user information"
+
+# (query text, collection version) -> company context chunks
+_email_context_cache = {}
+_email_context_lock = threading.Lock()
 
 load_dotenv('.env')
 
 @stage_log(2)
 def get_grouped_leads():
-    if not os.path.exists(MASTER_PATH):
-        return {}
+    return lead_store.get_grouped_leads()
+
+@stage_log(2)
+def get_leads_page(cursor=None, limit=lead_store.DEFAULT_PAGE_SIZE, source=None, min_email_count=None,
+                   max_email_count=None, sent_after=None, sent_before=None, search=None):
+    return lead_store.query_leads(
+        cursor=cursor, limit=limit, source=source,
+        min_email_count=min_email_count, max_email_count=max_email_count,
+        sent_after=sent_after, sent_before=sent_before, search=search
+    )
+
+@stage_log(2)
+def get_leads_summary():
+    return {'sources': lead_store.get_source_summary()}
 
-    df = pd.read_excel(MASTER_PATH)
-    grouped = {}
 
-    for _, row in df.iterrows():
-        src = row.get('source', 'Unknown')
-        val = row.get('Email Sent Count', row.get('email_count', 0))
-        if pd.isna(val):
-            val = 0
-        lead = {
-            'id': row['ID'],
-            'name': row['Name'],
-            'company': row['Company'],
-            'email': row['Email'],
-            'description': row['Description'],
-            'source': src,
-            'email_count': row['email_count'],
-            'last_email_sent': str(row.get('Last Email Sent', ''))
-        }
-        grouped.setdefault(src, []).append(lead)
+def _outreach_entry(job):
+    # Existing report rows (same Email) keep their UUID; only Sent Date and Private Link are refreshed
+    return {
+        'ID': job['lead_id'],
+        'Name': job['row']['Name'],
+        'Company': job['row']['Company'],
+        'Email': job['row']['Email'],
+        'Description': job['row']['Description'],
+        'Private Link': job['private_link'],
+        'Chat Summary': '',
+        'Status (Hot/Warm/Cold/Not Responded)': 'Not Responded',
+        'source': job['row'].get('source', ''),
+        'Connected': job['row'].get('Connected', False)
+    }
+
 
-    return grouped
+def _revert_outreach(job):
+    # A lead whose email never went out must not show up as contacted
+    try:
+        report_store.revert_outreach(job['lead_id'], created=not job['known'],
+                                     previous_sent_date=job['known'][1] if job['known'] else None)
+    except Exception as e:
+        print(f"Error reverting report row for {job['row']['Email']}: {str(e)}")
 
 
 @stage_log(1)
-def send_emails_to_leads(lead_ids):
-    if not os.path.exists(MASTER_PATH):
-        return {'success': False, 'error': 'No leads file found', 'results': []}
-        
+def send_emails_to_leads(lead_ids, llm_concurrency=LLM_CONCURRENCY, llm_requests_per_minute=LLM_REQUESTS_PER_MINUTE,
+                         progress_callback=None, retrieval_mode=EMAIL_RETRIEVAL_MODE):
     try:
-        df = pd.read_excel(MASTER_PATH)
+        df = lead_store.get_leads_frame(lead_ids)
     except Exception as e:
-        return {'success': False, 'error': f'Failed to read leads file: {str(e)}', 'results': []}
+        return {'success': False, 'error': f'Failed to read leads: {str(e)}', 'results': []}
+    if df.empty:
+        return {'success': False, 'error': 'No matching leads found', 'results': []}
         
-    results = []
     sender_email = config.EMAIL_SENDER
     sender_password = config.EMAIL_PASSWORD
     
@@ -73,163 +101,129 @@ def send_emails_to_leads(lead_ids):
     # Setup LLM, embeddings, and Chroma
     try:
         llm, embeddings = setup_llm_and_embeddings()
-        company_collection = Chroma(
-            collection_name="company_info_store",
-            persist_directory=PERSIST_DIRECTORY,
-            embedding_function=embeddings,
-            collection_metadata={"hnsw:space": "cosine"}
-        )
+        company_collection = get_company_collection(embeddings)
     except Exception as e:
         return {'success': False, 'error': f'Failed to initialize Azure services: {str(e)}', 'results': []}
 
-    # --- REPORT LOGIC ---
-    report_columns = [
-        'ID', 'Name', 'Company', 'Email', 'Description',
-        'Private Link', 'Sent Date', 'Chat Summary',
-        'Status (Hot/Warm/Cold/Not Responded)', 'source'
-    ]
+    # Leads already in the report keep their UUID, so links sent to them earlier keep working
     try:
-        if os.path.exists(REPORT_PATH):
-            report_df = pd.read_excel(REPORT_PATH)
-        else:
-            report_df = pd.DataFrame(columns=report_columns)
-            report_df.to_excel(REPORT_PATH, index=False)
+        known_leads = report_store.outreach_targets(df['Email'].tolist())
     except Exception as e:
-        return {'success': False, 'error': f'Failed to initialize report: {str(e)}', 'results': []}
-    # --- END REPORT LOGIC ---
-    
-    has_error = False
-    for idx, row in df.iterrows():
-        if str(row['ID']) not in [str(i) for i in lead_ids]:
-            continue
-            
+        return {'success': False, 'error': f'Failed to read report: {str(e)}', 'results': []}
+
+    # One slot per lead keeps results in lead order whatever order the stages finish in
+    results = [None] * len(df)
+
+    def record(pos, entry):
+        results[pos] = entry
+        if progress_callback:
+            progress_callback(entry)
+
+    # Cooldown is one vectorized mask; only eligible rows reach the per-lead pipeline
+    df = df.reset_index(drop=True)
+    last_sent = pd.to_datetime(df['Last Email Sent'], errors='coerce')
+    cooling = last_sent.notna() & ((pd.Timestamp(now) - last_sent) < pd.Timedelta(hours=COOLDOWN_HOURS))
+    for pos in df.index[cooling]:
+        record(pos, {'id': df.at[pos, 'ID'], 'status': 'cooldown'})
+
+    jobs = []
+    eligible = df.loc[~cooling]
+    for pos, row in zip(eligible.index, eligible.to_dict(orient='records')):
         try:
-            last_sent = row.get('Last Email Sent', pd.NaT)
-            if pd.notna(last_sent):
-                last_sent_time = pd.to_datetime(last_sent)
-                if now - last_sent_time < timedelta(hours=COOLDOWN_HOURS):
-                    results.append({'id': row['ID'], 'status': 'cooldown'})
-                    continue
-                    
             # Generate private link
-            lead_id = str(uuid.uuid4())
-            private_link = generate_private_link(lead_id)
-            
-            # Prepare user info for LLM
-            user_info = {
-                'name': row['Name'],
-                'company': row['Company'],
-                'email': row['Email']
-            }
-            
-            # Prepare email content using LLM and Chroma
+            known = known_leads.get(row['Email'])
+            lead_id = known[0] if known else str(uuid.uuid4())
+            jobs.append({
+                'pos': pos,
+                'row': row,
+                'lead_id': lead_id,
+                'known': known,
+                'private_link': generate_private_link(lead_id),
+                'user_info': {
+                    'name': row['Name'],
+                    'company': row['Company'],
+                    'email': row['Email']
+                }
+            })
+        except Exception as e:
+            record(pos, {'id': row['ID'], 'status': 'error', 'error': f'Processing error: {str(e)}'})
+
+    # Retrieval happens once up front: a shared context, or one batched embedding call for all leads
+    shared_context = None
+    lead_vectors = {}
+    try:
+        if retrieval_mode == 'per_lead' and jobs:
+            queries = [lead_retrieval_query(job['row']) for job in jobs]
+            with metrics.track('embedding', 'email_lead_queries'):
+                # Goes through the query-embedding cache when the client has one
+                embed = getattr(embeddings, 'embed_queries', embeddings.embed_documents)
+                vectors = embed(queries)
+            for job, vector in zip(jobs, vectors):
+                lead_vectors[job['pos']] = vector
+        elif jobs:
+            shared_context = get_email_company_context(company_collection, embeddings)
+    except Exception as e:
+        print(f"Error preparing email retrieval: {str(e)}")
+
+    limiter = RateLimiter(llm_requests_per_minute)
+
+    def generate(job):
+        company_context = shared_context
+        if job['pos'] in lead_vectors:
+            company_context = search_company_context(company_collection, lead_vectors[job['pos']])
+        limiter.wait()
+        return generate_email_content(company_collection, job['user_info'], llm, embeddings, job['private_link'],
+                                      company_context=company_context)
+
+    # Generation stage runs on the pool; delivery drains finished drafts on this thread
+    # over one reused SMTP login
+    with ThreadPoolExecutor(max_workers=max(1, llm_concurrency)) as pool, \
+            SMTPSession(sender_email, sender_password) as smtp:
+        futures = {pool.submit(generate, job): job for job in jobs}
+        for future in as_completed(futures):
+            job = futures[future]
+            row = job['row']
             try:
-                message_content = generate_email_content(company_collection, user_info, llm, embeddings, private_link)
-                if not message_content:
-                    results.append({
-                        'id': row['ID'],
-                        'status': 'no_content',
-                        'error': 'Failed to generate email content'
-                    })
-                    has_error = True
-                    continue
+                message_content = future.result()
             except Exception as e:
-                results.append({
-                    'id': row['ID'],
-                    'status': 'llm_error',
-                    'error': f'LLM error: {str(e)}'
-                })
-                has_error = True
+                record(job['pos'], {'id': row['ID'], 'status': 'llm_error', 'error': f'LLM error: {str(e)}'})
                 continue
-                
-            # Send email
+            if not message_content:
+                record(job['pos'], {'id': row['ID'], 'status': 'no_content', 'error': 'Failed to generate email content'})
+                continue
+            # The report row goes in before the email so its private link works the moment it arrives
             try:
-                success = send_email_real(sender_email, sender_password, row['Email'], "Invitation to Chat with Caze BizConAI", message_content)
-                if success:
-                    # Increment email count
-                    if 'Email Sent Count' in df.columns:
-                        df.at[idx, 'Email Sent Count'] = int(df.at[idx, 'Email Sent Count'] or 0) + 1
-                    elif 'email_count' in df.columns:
-                        df.at[idx, 'email_count'] = int(df.at[idx, 'email_count'] or 0) + 1
-
-                    df.at[idx, 'Last Email Sent'] = now
-                    
-                    # --- REPORT LOGIC ---
-                    try:
-                        # Check if lead already exists in report
-                        existing_lead = report_df[report_df['Email'] == row['Email']]
-                        if not existing_lead.empty:
-                            # Update sent date
-                            report_df.loc[report_df['Email'] == row['Email'], 'Sent Date'] = now
-                        else:
-                            # Add new lead to report
-                            new_lead = {
-                                'ID': lead_id,
-                                'Name': row['Name'],
-                                'Company': row['Company'],
-                                'Email': row['Email'],
-                                'Description': row['Description'],
-                                'Private Link': private_link,
-                                'Sent Date': now,
-                                'Chat Summary': '',
-                                'Status (Hot/Warm/Cold/Not Responded)': 'Not Responded',
-                                'source': row.get('source', ''),
-                                'Connected': row.get('Connected', False)
-                            }
-                            report_df = pd.concat([report_df, pd.DataFrame([new_lead])], ignore_index=True)
-                        report_df.to_excel(REPORT_PATH, index=False)
-                    except Exception as e:
-                        results.append({
-                            'id': row['ID'],
-                            'status': 'error',
-                            'error': f'Failed to update report: {str(e)}'
-                        })
-                        has_error = True
-                        continue
-                    # --- END REPORT LOGIC ---
-                    
-                    results.append({'id': row['ID'], 'status': 'sent'})
-                else:
-                    results.append({
-                        'id': row['ID'],
-                        'status': 'error',
-                        'error': 'Failed to send email'
-                    })
-                    has_error = True
+                report_store.upsert_outreach([_outreach_entry(job)], now)
             except Exception as e:
-                results.append({
-                    'id': row['ID'],
-                    'status': 'error',
-                    'error': f'Email sending error: {str(e)}'
-                })
-                has_error = True
-                
-        except Exception as e:
-            results.append({
-                'id': row['ID'],
-                'status': 'error',
-                'error': f'Processing error: {str(e)}'
-            })
-            has_error = True
-            
-    try:
-        df.to_excel(MASTER_PATH, index=False)
-    except Exception as e:
-        return {
-            'success': False,
-            'error': f'Failed to save leads file: {str(e)}',
-            'results': results
-        }
-        
+                record(job['pos'], {'id': row['ID'], 'status': 'error', 'error': f'Failed to update report: {str(e)}'})
+                continue
+            try:
+                success = send_email_real(sender_email, sender_password, row['Email'], EMAIL_SUBJECT, message_content, session=smtp)
+                error = 'Failed to send email'
+            except Exception as e:
+                success, error = False, f'Email sending error: {str(e)}'
+            if not success:
+                _revert_outreach(job)
+                record(job['pos'], {'id': row['ID'], 'status': 'error', 'error': error})
+                continue
+            # Counted straight away so the cooldown holds even if the job dies later in the batch
+            try:
+                lead_store.record_emails_sent([row['ID']], now)
+            except Exception as e:
+                record(job['pos'], {'id': row['ID'], 'status': 'error', 'error': f'Failed to save lead: {str(e)}'})
+                continue
+            record(job['pos'], {'id': row['ID'], 'status': 'sent'})
+
+    has_error = any(r['status'] not in ('sent', 'cooldown') for r in results)
     return {
         'success': not has_error,
         'results': results
     }
 
 @stage_log(1)
-def generate_email_content(company_collection, user_info, llm, embeddings, product_link):
+def generate_email_content(company_collection, user_info, llm, embeddings, product_link, company_context=None):
     # Query company info and user info context
-    context = query_collections_for_email(company_collection, user_info, embeddings, llm)
+    context = query_collections_for_email(company_collection, user_info, embeddings, llm, company_context)
     if not context:
         print("No context generated for email.")
         return None
@@ -260,20 +254,39 @@ def generate_email_content(company_collection, user_info, llm, embeddings, produ
     print("LLM content:", content)
     return content + f"\n\nClick here to chat with us: {product_link}"
 
+def lead_retrieval_query(row):
+    parts = [row.get('Company'), row.get('Description')]
+    text = " ".join(str(p) for p in parts if p is not None and pd.notna(p)).strip()
+    return text or EMAIL_CONTEXT_QUERY
+
+def search_company_context(company_collection, vector):
+    with metrics.track('chroma', 'email_context_search'):
+        company_results = company_collection.similarity_search_by_vector(embedding=vector, k=1)
+    return [r.page_content for r in company_results or [] if hasattr(r, "page_content")]
+
+def get_email_company_context(company_collection, embeddings, query_text=EMAIL_CONTEXT_QUERY):
+    """Company context for a query, embedded and searched once per collection version."""
+    key = (query_text, get_collection_version())
+    with _email_context_lock:
+        cached = _email_context_cache.get(key)
+    if cached is not None:
+        return cached
+    with metrics.track('embedding', 'email_context_query'):
+        vector = embeddings.embed_query(query_text)
+    context = search_company_context(company_collection, vector)
+    with _email_context_lock:
+        # Entries for older collection versions can never be hit again
+        for stale in [k for k in _email_context_cache if k[1] != key[1]]:
+            del _email_context_cache[stale]
+        _email_context_cache[key] = context
+    return context
+
 @stage_log(2)
-def query_collections_for_email(company_collection, user_info, embeddings, llm):
-    # Use a simple query for now
-    query_text = "company information and user information, company information more related to the user information"
+def query_collections_for_email(company_collection, user_info, embeddings, llm, company_context=None):
     try:
-        company_results = company_collection.similarity_search_by_vector(
-            embedding=embeddings.embed_query(query_text), k=1
-        )
-        print("Chroma company_results:", company_results)
-        context = []
-        if company_results and len(company_results) > 0:
-            for result in company_results:
-                if hasattr(result, "page_content"):
-                    context.append(result.page_content)
+        if company_context is None:
+            company_context = get_email_company_context(company_collection, embeddings)
+        context = list(company_context)
         print("Context after Chroma:", context)
         user_context = f"Name: {user_info.get('name', '')}\nCompany: {user_info.get('company', '')}\nEmail: {user_info.get('email', '')}"
         formatted_context = "<< COMPANY INFO >>\n" + "\n".join(context) + "\n\n<<END OF COMPANY INFO>>\n\n<< USER INFO >>\n" + user_context + "\n<<END OF USER INFO>>"
@@ -284,18 +297,18 @@ def query_collections_for_email(company_collection, user_info, embeddings, llm):
         return None
 
 @stage_log(1)
-def send_email_real(sender_email, sender_password, recipient_email, subject, message):
+def send_email_real(sender_email, sender_password, recipient_email, subject, message, session=None):
     try:
         msg = MIMEMultipart()
         msg['From'] = sender_email
         msg['To'] = recipient_email
         msg['Subject'] = subject
         msg.attach(MIMEText(message, 'plain'))
-        server = smtplib.SMTP('smtp.gmail.com', 587)
-        server.starttls()
-        server.login(sender_email, sender_password)
-        server.send_message(msg)
-        server.quit()
+        if session is not None:
+            session.send_message(msg)
+        else:
+            with SMTPSession(sender_email, sender_password) as one_off:
+                one_off.send_message(msg)
         return True
     except Exception as e:
         print(f"Error sending email: {str(e)}")
@@ -0,0 +1,86 @@
+import smtplib
+import threading
+import config
+import metrics
+
+DEFAULT_SMTP_SERVER = 'smtp.gmail.com'
+DEFAULT_SMTP_PORT = 587
+# Providers throttle long-lived sessions; start a fresh login after this many messages
+MAX_MESSAGES_PER_CONNECTION = 100
+
+
+class SMTPSession:
+    """
+    One authenticated SMTP connection reused across a batch of messages.
+    The connection is opened lazily, re-established if the server drops it,
+    and closed when the session is used as a context manager and exits.
+    STARTTLS is mandatory; `allow_plaintext=True` is only for a local test
+    server that cannot offer it.
+    """
+    def __init__(self, sender_email, sender_password, server=None, port=None, timeout=30,
+                 allow_plaintext=False):
+        self.sender_email = sender_email
+        self.sender_password = sender_password
+        self.server = server or config.EMAIL_SMTP_SERVER or DEFAULT_SMTP_SERVER
+        self.port = int(port or config.EMAIL_SMTP_PORT or DEFAULT_SMTP_PORT)
+        self.timeout = timeout
+        self.allow_plaintext = allow_plaintext
+        self._conn = None
+        self._sent_on_conn = 0
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def connect(self):
+        with self._lock:
+            self._ensure_connection()
+
+    def _ensure_connection(self):
+        if self._conn is not None and self._sent_on_conn < MAX_MESSAGES_PER_CONNECTION:
+            return
+        self._close_connection()
+        with metrics.track('smtp', 'connect'):
+            conn = smtplib.SMTP(self.server, self.port, timeout=self.timeout)
+            try:
+                conn.ehlo()
+                if not self.allow_plaintext or conn.has_extn('starttls'):
+                    # Raises SMTPNotSupportedError rather than falling back to cleartext
+                    conn.starttls()
+                    conn.ehlo()
+                if self.sender_password:
+                    conn.login(self.sender_email, self.sender_password)
+            except Exception:
+                conn.close()
+                raise
+        self._conn = conn
+        self._sent_on_conn = 0
+
+    def _close_connection(self):
+        conn, self._conn = self._conn, None
+        if conn is None:
+            return
+        try:
+            conn.quit()
+        except Exception:
+            conn.close()
+
+    def send_message(self, msg):
+        with self._lock:
+            self._ensure_connection()
+            with metrics.track('smtp', 'send_message'):
+                try:
+                    self._conn.send_message(msg)
+                except (smtplib.SMTPServerDisconnected, ConnectionError):
+                    # Idle connections get dropped by the server; retry once on a fresh one
+                    self._close_connection()
+                    self._ensure_connection()
+                    self._conn.send_message(msg)
+            self._sent_on_conn += 1
+
+    def close(self):
+        with self._lock:
+            self._close_connection()
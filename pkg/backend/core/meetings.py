@@ -0,0 +1,86 @@
+"""
+Meeting proposals for interested leads: pick a product, find who owns it,
+find a common slot and create the meeting. Used by the meeting endpoints and
+by the end-of-conversation report update.
+"""
+import logging
+import threading
+from logging_utils import stage_log
+from core.settings import MeetingSchedulingError
+from core.storage import Storage
+from core.agents.product_extractor import ProductExtractorAgent
+from core.agents.responsible_person import ResponsiblePersonAgent
+from core.agents.availability import AvailabilityAgent
+from core.agents.meeting_scheduler import MeetingSchedulerAgent
+from core.agents.email import EmailAgent
+
+logger = logging.getLogger(__name__)
+
+_agents = None
+_agents_lock = threading.Lock()
+
+
+def _get_agents():
+    # Built on first use so importing this module stays cheap
+    global _agents
+    with _agents_lock:
+        if _agents is None:
+            storage = Storage()
+            _agents = {
+                'storage': storage,
+                'product_extractor': ProductExtractorAgent(),
+                'responsible_person': ResponsiblePersonAgent(storage),
+                'availability': AvailabilityAgent(),
+                'meeting_scheduler': MeetingSchedulerAgent(),
+                'email': EmailAgent(),
+            }
+    return _agents
+
+
+@stage_log(2)
+def orchestrate_meeting_flow(chat_summary: str, lead_email: str, lead_name: str, send_email: bool = True) -> dict:
+    agents = _get_agents()
+    # 1. Extract product from chat summary
+    company_info = agents['storage'].get_company_info().get('info', '')
+    products = agents['product_extractor'].extract_products(company_info)
+    if not products:
+        raise MeetingSchedulingError("No products found in company info.")
+    # For demo, pick the first product
+    product = products[0]
+    # 2. Find responsible person (with fallback)
+    responsible = agents['responsible_person'].get_responsible_person(product)
+    if responsible.get('email', '').startswith('default-'):
+        logger.warning(f"No responsible person set for product '{product}'. Using default: {responsible}")
+    # 3. Check availability
+    slots = agents['availability'].check_availability(lead_email, responsible['email'])
+    if not slots:
+        raise MeetingSchedulingError("No available slots found.")
+    slot = slots[0]
+    # 4. Schedule meeting
+    meeting_link = agents['meeting_scheduler'].create_meeting(slot, [lead_email, responsible['email']])
+    if not meeting_link:
+        raise MeetingSchedulingError("Failed to create meeting link.")
+    # 5. Prepare email
+    details = {
+        'subject': f'Meeting Scheduled for {product}',
+        'body': f'Hi {lead_name}, your meeting for {product} is scheduled with {responsible["name"]}.'
+    }
+    email_content = f"Hi {lead_name}, your meeting for {product} is scheduled with {responsible['name']} at {slot}. Meeting Link: {meeting_link}"
+    email_sent = False
+    if send_email:
+        email_sent = agents['email'].send_meeting_invite(lead_email, meeting_link, details)
+        if not email_sent:
+            raise MeetingSchedulingError("Failed to send meeting invite email.")
+    return {
+        "success": True,
+        "meeting_link": meeting_link,
+        "slot": slot,
+        "responsible": responsible,
+        "product": product,
+        "email_content": email_content,
+        "email_sent": email_sent
+    }
+
+
+def send_meeting_invite(lead_email: str, meeting_link: str, details: dict) -> bool:
+    return _get_agents()['email'].send_meeting_invite(lead_email, meeting_link, details)
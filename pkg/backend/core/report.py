@@ -1,8 +1,9 @@
 import os
 import json
 import pandas as pd
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, jsonify, request, send_file
 from .settings import get_private_link_config, get_report_path
+from . import report_store
 from .leads import get_status_for_email, generate_private_link
 from logging_utils import stage_log
 
@@ -15,13 +16,10 @@ report_bp = Blueprint('report', __name__)
 
 @report_bp.route('/api/report', methods=['GET'])
 def get_report():
-    report_path = get_report_path()
-    if not os.path.exists(report_path):
-        return jsonify({'leads': []})
     try:
-        df = pd.read_excel(report_path)
+        df = report_store.get_report_frame()
     except Exception as e:
-        print(f"Error reading report.xlsx: {e}")
+        print(f"Error reading report: {e}")
         return jsonify({'leads': []})
 
     # Remove any processing: just drop duplicates if you want, or even skip that
@@ -37,3 +35,11 @@ def get_report():
 
     return jsonify({'leads': leads})
 
+@report_bp.route('/api/report/export', methods=['GET'])
+@stage_log(2)
+def export_report():
+    try:
+        path = report_store.export_report(os.path.abspath(get_report_path()))
+        return send_file(path, as_attachment=True)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
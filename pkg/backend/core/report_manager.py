@@ -1,35 +1,45 @@
-import pandas as pd
-import os
+import logging
+import re
+from typing import Literal
+from pydantic import BaseModel, Field
+from . import report_store
+
+logger = logging.getLogger(__name__)
+
+class ConversationAssessment(BaseModel):
+    """Summary and interest level of a finished prospect conversation."""
+    summary: str = Field(description="Summary of the conversation in about 50 words, including any contact details and key points discussed")
+    status: Literal['Hot', 'Warm', 'Cold'] = Field(description="'Hot' (very interested), 'Warm' (partially interested) or 'Cold' (not interested)")
 
 class ReportManager:
-    def __init__(self, report_path='data/report.xlsx'):
-        self.report_path = report_path
-    
     def update_report(self, uuid, summary, status):
-        if not os.path.exists(self.report_path):
-            raise FileNotFoundError(f"Report file not found at {self.report_path}")
-        
-        df = pd.read_excel(self.report_path)
-        mask = df['ID'].astype(str) == str(uuid)
-        
-        if not mask.any():
+        updated = report_store.update_entry(uuid, {
+            'Chat Summary': summary,
+            'Status (Hot/Warm/Cold/Not Responded)': status
+        })
+        if not updated:
             raise ValueError(f"UUID {uuid} not found in report")
-        
-        df.loc[mask, 'Chat Summary'] = summary
-        df.loc[mask, 'Status'] = status
-        
-        df.to_excel(self.report_path, index=False)
-
-def generate_chat_summary(llm, messages):
-    messages_content = [f"{msg['role']}: {msg['message']}" for msg in messages]
-    prompt = f"From this conversation between the AI agent and the consumer prepare a summary in 50 words, provide everything including the contact details: {messages_content}"
-    
-    response = llm.invoke([{"role": "user", "content": prompt}])
-    return response.content
 
-def determine_interest_status(llm, messages):
+def assess_conversation(llm, messages):
+    """
+    Summary and Hot/Warm/Cold status from a single LLM call.
+    Uses tool calling; if the deployment rejects it or returns something that
+    doesn't parse, one plain-text call in a fixed format is used instead.
+    """
     messages_content = [f"{msg['role']}: {msg['message']}" for msg in messages]
-    prompt = f"Based on the following conversation {messages_content}, categorize the user's interest level as one of: 'Hot' (very interested), 'Warm' (partially interested), or 'Cold' (not interested). Give just one word answer."
-    
-    response = llm.invoke([{"role": "user", "content": prompt}])
-    return response.content.strip()
\ No newline at end of file
+    prompt = f"Summarize this conversation and categorize the prospect's interest level: {messages_content}"
+    try:
+        structured = llm.with_structured_output(ConversationAssessment, method="function_calling")
+        assessment = structured.invoke([{"role": "user", "content": prompt}])
+        return assessment.summary.strip(), assessment.status
+    except Exception as e:
+        logger.warning(f"Structured conversation assessment failed, using plain prompt: {e}")
+    fallback_prompt = (
+        f"From this conversation between the AI agent and the consumer {messages_content}, reply in exactly this format:\n"
+        "STATUS: <Hot, Warm or Cold> ('Hot' very interested, 'Warm' partially interested, 'Cold' not interested)\n"
+        "SUMMARY: <summary in 50 words, including any contact details and key points discussed>"
+    )
+    text = llm.invoke([{"role": "user", "content": fallback_prompt}]).content
+    status = re.search(r"STATUS:\s*(Hot|Warm|Cold)", text, re.IGNORECASE)
+    summary = re.search(r"SUMMARY:\s*(.*)", text, re.IGNORECASE | re.DOTALL)
+    return (summary.group(1) if summary else text).strip(), status.group(1).capitalize() if status else 'Cold'
@@ -0,0 +1,269 @@
+import json
+import os
+import threading
+import pandas as pd
+from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, Boolean
+from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.orm import sessionmaker
+
+Base = declarative_base()
+DB_PATH = 'sqlite:///data/report.db'
+LEGACY_REPORT_PATH = 'data/report.xlsx'
+STATUS_COLUMN = 'Status (Hot/Warm/Cold/Not Responded)'
+
+os.makedirs("data", exist_ok=True)
+
+# Spreadsheet column -> ReportEntry attribute, in export order
+COLUMN_MAP = {
+    'ID': 'lead_uuid',
+    'Name': 'name',
+    'Company': 'company',
+    'Email': 'email',
+    'Description': 'description',
+    'Private Link': 'private_link',
+    'Sent Date': 'sent_date',
+    'Chat Summary': 'chat_summary',
+    STATUS_COLUMN: 'status',
+    'source': 'source',
+    'Connected': 'connected',
+    'Contact': 'contact',
+    'Pending Meeting Email': 'pending_meeting_email',
+    'Pending Meeting Info': 'pending_meeting_info',
+    'Meeting Email Sent': 'meeting_email_sent',
+}
+COLUMN_ALIASES = {'Status': STATUS_COLUMN}
+
+
+class ReportEntry(Base):
+    __tablename__ = 'report_entry'
+    id = Column(Integer, primary_key=True)
+    lead_uuid = Column(String, unique=True, index=True, nullable=False)
+    name = Column(String)
+    company = Column(String)
+    email = Column(String, index=True)
+    description = Column(Text)
+    private_link = Column(String)
+    sent_date = Column(DateTime)
+    chat_summary = Column(Text)
+    status = Column(String)
+    source = Column(String)
+    connected = Column(Boolean, default=False)
+    contact = Column(String)
+    pending_meeting_email = Column(Text)
+    pending_meeting_info = Column(Text)
+    meeting_email_sent = Column(String)
+    # Any other spreadsheet columns, kept as JSON so exports round-trip
+    extra = Column(Text)
+
+
+engine = create_engine(DB_PATH, echo=False)
+Base.metadata.create_all(engine)
+Session = sessionmaker(bind=engine)
+
+_migration_lock = threading.Lock()
+_migrated = False
+# Every lead UUID in the report, so private-link checks never query the database
+_uuid_index = None
+_uuid_index_lock = threading.Lock()
+
+
+def _clean(value):
+    if value is None:
+        return None
+    try:
+        if pd.isna(value):
+            return None
+    except (TypeError, ValueError):
+        pass
+    return value
+
+
+def _coerce(attr, value):
+    value = _clean(value)
+    if attr == 'lead_uuid':
+        return str(value)
+    if attr == 'connected':
+        return value is True or str(value).strip().lower() in ('true', '1', 'yes')
+    if attr == 'sent_date' and value is not None:
+        value = pd.to_datetime(value, errors='coerce')
+        return None if pd.isna(value) else value.to_pydatetime()
+    return value
+
+
+def _apply(entry, fields: dict):
+    extra = json.loads(entry.extra) if entry.extra else {}
+    for column, value in fields.items():
+        column = COLUMN_ALIASES.get(column, column)
+        attr = COLUMN_MAP.get(column)
+        if attr:
+            setattr(entry, attr, _coerce(attr, value))
+        else:
+            extra[column] = _clean(value)
+    entry.extra = json.dumps(extra, default=str) if extra else None
+
+
+def _to_record(entry) -> dict:
+    record = {column: getattr(entry, attr) for column, attr in COLUMN_MAP.items()}
+    if entry.extra:
+        for key, value in json.loads(entry.extra).items():
+            record.setdefault(key, value)
+    return record
+
+
+def _ensure_migrated():
+    """Import the legacy report workbook once, the first time the store is empty."""
+    global _migrated
+    if _migrated:
+        return
+    with _migration_lock:
+        if _migrated:
+            return
+        with Session() as session:
+            empty = session.query(ReportEntry.id).first() is None
+            if empty and os.path.exists(LEGACY_REPORT_PATH):
+                df = pd.read_excel(LEGACY_REPORT_PATH)
+                df = df.dropna(subset=['ID']).drop_duplicates(subset=['ID'], keep='last')
+                for fields in df.to_dict(orient='records'):
+                    entry = ReportEntry()
+                    _apply(entry, fields)
+                    session.add(entry)
+                session.commit()
+        _migrated = True
+
+
+def get_entry(lead_uuid) -> dict:
+    """Return one report row by lead UUID, or None."""
+    _ensure_migrated()
+    with Session() as session:
+        entry = session.query(ReportEntry).filter_by(lead_uuid=str(lead_uuid)).first()
+        return _to_record(entry) if entry else None
+
+
+def get_entry_by_email(email) -> dict:
+    _ensure_migrated()
+    with Session() as session:
+        entry = (session.query(ReportEntry).filter_by(email=email)
+                 .order_by(ReportEntry.id.desc()).first())
+        return _to_record(entry) if entry else None
+
+
+def _get_uuid_index() -> set:
+    global _uuid_index
+    if _uuid_index is None:
+        _ensure_migrated()
+        with _uuid_index_lock:
+            if _uuid_index is None:
+                with Session() as session:
+                    _uuid_index = {row[0] for row in session.query(ReportEntry.lead_uuid)}
+    return _uuid_index
+
+
+def warmup_uuid_index():
+    _get_uuid_index()
+
+
+def _index_uuids(uuids):
+    if _uuid_index is not None:
+        with _uuid_index_lock:
+            _uuid_index.update(uuids)
+
+
+def uuid_exists(lead_uuid) -> bool:
+    """Set lookup; a miss is confirmed against the store in case another writer added the row."""
+    lead_uuid = str(lead_uuid)
+    if lead_uuid in _get_uuid_index():
+        return True
+    with Session() as session:
+        found = session.query(ReportEntry.id).filter_by(lead_uuid=lead_uuid).first() is not None
+    if found:
+        _index_uuids([lead_uuid])
+    return found
+
+
+def update_entry(lead_uuid, fields: dict) -> bool:
+    """Update the given spreadsheet columns of one row; False if the UUID is unknown."""
+    _ensure_migrated()
+    with Session() as session:
+        entry = session.query(ReportEntry).filter_by(lead_uuid=str(lead_uuid)).first()
+        if not entry:
+            return False
+        _apply(entry, fields)
+        session.commit()
+        return True
+
+
+def outreach_targets(emails) -> dict:
+    """Email -> (UUID, Sent Date) of the latest report row, for emails already in the report."""
+    _ensure_migrated()
+    emails = [email for email in dict.fromkeys(emails) if email]
+    found = {}
+    with Session() as session:
+        # Kept under SQLite's bound-parameter limit
+        for start in range(0, len(emails), 500):
+            query = (session.query(ReportEntry).filter(ReportEntry.email.in_(emails[start:start + 500]))
+                     .order_by(ReportEntry.id))
+            for entry in query:
+                found[entry.email] = (entry.lead_uuid, entry.sent_date)
+    return found
+
+
+def upsert_outreach(entries: list, sent_at) -> list:
+    """
+    Record sent invitations in one transaction.
+    A lead already in the report (matched by Email) keeps its row and UUID;
+    only its Sent Date and Private Link are refreshed. New leads are added
+    with the given fields.
+    Returns the report UUID of each entry.
+    """
+    _ensure_migrated()
+    uuids = []
+    with Session() as session:
+        for fields in entries:
+            entry = (session.query(ReportEntry).filter_by(email=fields.get('Email'))
+                     .order_by(ReportEntry.id.desc()).first())
+            if entry:
+                entry.sent_date = sent_at
+                if fields.get('Private Link'):
+                    entry.private_link = fields['Private Link']
+            else:
+                entry = ReportEntry()
+                _apply(entry, dict(fields, **{'Sent Date': sent_at}))
+                session.add(entry)
+            uuids.append(entry.lead_uuid)
+        session.commit()
+    _index_uuids(uuids)
+    return uuids
+
+
+def revert_outreach(lead_uuid, created, previous_sent_date=None):
+    """
+    Undo upsert_outreach for an invitation that was never delivered: a row
+    it added is removed, an existing row gets its previous Sent Date back.
+    """
+    lead_uuid = str(lead_uuid)
+    with Session() as session:
+        entry = session.query(ReportEntry).filter_by(lead_uuid=lead_uuid).first()
+        if not entry:
+            return
+        if created:
+            session.delete(entry)
+        else:
+            entry.sent_date = previous_sent_date
+        session.commit()
+    if created and _uuid_index is not None:
+        with _uuid_index_lock:
+            _uuid_index.discard(lead_uuid)
+
+
+def get_report_frame() -> pd.DataFrame:
+    """Return the whole report with the spreadsheet column names."""
+    _ensure_migrated()
+    with Session() as session:
+        records = [_to_record(e) for e in session.query(ReportEntry).order_by(ReportEntry.id)]
+    return pd.DataFrame(records, columns=None if records else list(COLUMN_MAP))
+
+
+def export_report(path: str = LEGACY_REPORT_PATH) -> str:
+    """Write the report to an .xlsx file in the old layout."""
+    get_report_frame().to_excel(path, index=False)
+    return path
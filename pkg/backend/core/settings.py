@@ -4,8 +4,14 @@ from dotenv import load_dotenv
 from logging_utils import stage_log
 import logging
 import smtplib
+import threading
+import time
+from langchain_core.callbacks import BaseCallbackHandler
 from langchain_openai import AzureChatOpenAI, AzureOpenAIEmbeddings
 import config
+import metrics
+from core.mailer import SMTPSession
+from core.embedding_cache import CachedEmbeddings
 
 # Custom Exceptions
 class InvalidCredentialsError(Exception):
@@ -24,13 +30,15 @@ logger = logging.getLogger(__name__)
 
 DATA_DIR = 'data'
 
+# Shared (llm, embeddings) pair; rebuilt only after the Azure settings change
+_llm_clients = None
+_llm_clients_lock = threading.Lock()
+
 def validate_email_credentials(sender: str, password: str) -> None:
     """Validate email credentials by testing SMTP connection"""
     try:
-        server = smtplib.SMTP('smtp.gmail.com', 587)
-        server.starttls()
-        server.login(sender, password)
-        server.quit()
+        with SMTPSession(sender, password) as session:
+            session.connect()
     except smtplib.SMTPAuthenticationError:
         raise InvalidCredentialsError("Invalid email credentials. Please check your email and password.")
     except Exception as e:
@@ -98,6 +106,7 @@ def save_azure_settings(data: Dict[str, Any]) -> Dict[str, Any]:
             data["deployment"],
             data["embedding_deployment"]
         )
+        reset_llm_clients()
         
         logger.info("Azure settings saved successfully")
         return {"success": True, "message": "Azure settings saved successfully"}
@@ -190,15 +199,41 @@ def get_all_config() -> Dict[str, Any]:
 def get_report_path():
     return os.path.join(DATA_DIR, 'report.xlsx')
 
-def setup_llm_and_embeddings():
-    # No need for importlib.reload with JSON config - values are always fresh
+class LLMMetricsCallback(BaseCallbackHandler):
+    """Feeds every chat completion made through the shared client into the llm metrics."""
+    def __init__(self, name):
+        self.name = name
+        self._started = {}
+        self._lock = threading.Lock()
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        with self._lock:
+            self._started[run_id] = time.perf_counter()
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        with self._lock:
+            self._started[run_id] = time.perf_counter()
+
+    def _finish(self, run_id, error):
+        with self._lock:
+            start = self._started.pop(run_id, None)
+        if start is not None:
+            metrics.observe('llm', self.name, time.perf_counter() - start, error=error)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        self._finish(run_id, False)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._finish(run_id, True)
+
+def _build_llm_and_embeddings():
     azure_endpoint = config.AZURE_OPENAI_ENDPOINT
     azure_deployment = config.AZURE_OPENAI_DEPLOYMENT_NAME
     azure_api_version = config.AZURE_OPENAI_API_VERSION
     azure_api_key = config.AZURE_OPENAI_API_KEY
     azure_embedding_deployment = config.AZURE_OPENAI_EMBEDDING_DEPLOYMENT
     
-    logger.info(f"Attempting to set up LLM and embeddings with:")
+    logger.info(f"Setting up shared LLM and embeddings clients with:")
     logger.info(f"azure_endpoint: {azure_endpoint}")
     logger.info(f"azure_deployment: {azure_deployment}")
     logger.info(f"azure_api_version: {azure_api_version}")
@@ -209,15 +244,13 @@ def setup_llm_and_embeddings():
     llm = None
 
     try:
-        embeddings = AzureOpenAIEmbeddings(
+        embeddings = CachedEmbeddings(AzureOpenAIEmbeddings(
             azure_endpoint=azure_endpoint,
             azure_deployment=azure_embedding_deployment,
             openai_api_version=azure_api_version,
             api_key=azure_api_key,
             max_retries=1
-        )
-        # Test with a simple embedding to ensure connectivity
-        embeddings.embed_query("test")
+        ), azure_embedding_deployment)
         logger.info("Azure OpenAI Embeddings initialized successfully.")
     except Exception as e:
         logger.error(f"Failed to initialize Azure OpenAI Embeddings: {e}")
@@ -230,13 +263,48 @@ def setup_llm_and_embeddings():
             api_version=azure_api_version,
             api_key=azure_api_key,
             temperature=0.1,
-            max_retries=1
+            max_retries=1,
+            callbacks=[LLMMetricsCallback(azure_deployment or 'chat')]
         )
-        # Test with a simple completion to ensure connectivity
-        llm.invoke("test")
         logger.info("Azure Chat OpenAI LLM initialized successfully.")
     except Exception as e:
         logger.error(f"Failed to initialize Azure Chat OpenAI LLM: {e}")
         raise ConfigurationError(f"Failed to initialize Azure Chat OpenAI LLM: {e}")
     
-    return llm, embeddings
\ No newline at end of file
+    return llm, embeddings
+
+def setup_llm_and_embeddings():
+    """Return the process-wide (llm, embeddings) pair, building it on first use."""
+    global _llm_clients
+    clients = _llm_clients
+    if clients is not None:
+        return clients
+    with _llm_clients_lock:
+        if _llm_clients is None:
+            _llm_clients = _build_llm_and_embeddings()
+        return _llm_clients
+
+def reset_llm_clients() -> None:
+    """Drop the cached clients so the next call picks up new credentials."""
+    global _llm_clients
+    with _llm_clients_lock:
+        _llm_clients = None
+
+def check_llm_health() -> Dict[str, Any]:
+    """Make one live embedding and one completion call with the shared clients."""
+    health = {"embeddings": "ok", "llm": "ok"}
+    try:
+        llm, embeddings = setup_llm_and_embeddings()
+    except ConfigurationError as e:
+        return {"healthy": False, "embeddings": str(e), "llm": str(e)}
+    try:
+        # Bypass the query cache so this is a real round-trip
+        getattr(embeddings, "inner", embeddings).embed_query("test")
+    except Exception as e:
+        health["embeddings"] = f"error: {e}"
+    try:
+        llm.invoke("test")
+    except Exception as e:
+        health["llm"] = f"error: {e}"
+    health["healthy"] = health["embeddings"] == "ok" and health["llm"] == "ok"
+    return health
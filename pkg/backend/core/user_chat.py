@@ -1,7 +1,8 @@
-import os, json, pandas as pd
-from flask import Blueprint, request, jsonify, current_app
+import os, json
+from flask import Blueprint, Response, request, jsonify, current_app, stream_with_context
 from logging_utils import stage_log
-from .chat_logic import generate_user_chat_response
+from .chat_logic import generate_user_chat_response, stream_user_chat_response, load_chat_window
+from . import report_store, chat_store
 
 user_chat_bp = Blueprint("user_chat", __name__, url_prefix="/api/user_chat")
 
@@ -10,16 +11,9 @@ def get_chats_dir():
     os.makedirs(chats_dir, exist_ok=True)
     return chats_dir
 
-def get_report_path():
-    return current_app.config.get("REPORT_PATH", "data/report.xlsx")
-
 @stage_log(2)
 def _is_valid_uuid(uuid: str) -> bool:
-    report_path = get_report_path()
-    if not os.path.exists(report_path):
-        return False
-    df = pd.read_excel(report_path, engine="openpyxl")
-    return str(uuid) in df["ID"].astype(str).values
+    return report_store.uuid_exists(uuid)
 
 @user_chat_bp.route("/<uuid>", methods=["GET", "POST"])
 @stage_log(1)
@@ -28,21 +22,24 @@ def user_chat(uuid):
         return jsonify({"error": "Invalid or expired chat link."}), 404
 
     chats_dir = get_chats_dir()
-    chat_file = os.path.join(chats_dir, f"{uuid}.json")
     
     if request.method == "GET":
-        # Return initial message if no chat history exists
-        if not os.path.exists(chat_file):
-            # Generate and save initial AI message
-            ai_response = generate_user_chat_response(uuid, [])
-            chat_history = [{"role": "ai", "message": ai_response}]
-            with open(chat_file, "w") as f:
-                json.dump(chat_history, f, ensure_ascii=False, indent=2)
-            return jsonify({"history": chat_history})  # Return full history instead of just response
-        else:
-            # Return existing chat history
-            chat_history = json.load(open(chat_file))
-            return jsonify({"history": chat_history})
+        with chat_store.conversation_lock(uuid):
+            # Return initial message if no chat history exists
+            if not chat_store.exists(uuid, chats_dir):
+                # Generate and save initial AI message
+                ai_response = generate_user_chat_response(uuid, [], chats_dir=chats_dir)
+                chat_history = [{"role": "ai", "message": ai_response}]
+                chat_store.append_messages(uuid, chat_history, chats_dir)
+                return jsonify({"history": chat_history})  # Return full history instead of just response
+        # Return existing chat history, a page at a time if asked
+        if request.args.get("limit") or request.args.get("cursor"):
+            try:
+                cursor, limit = chat_store.parse_page_args(request.args)
+            except ValueError:
+                return jsonify({"error": "cursor and limit must be non-negative integers"}), 400
+            return jsonify(chat_store.get_messages(uuid, cursor, limit, chats_dir))
+        return jsonify({"history": chat_store.get_history(uuid, chats_dir)})
     
     # Handle POST request for user messages
     data = request.get_json(silent=True) or {}
@@ -50,13 +47,56 @@ def user_chat(uuid):
     if not user_message:
         return jsonify({"error": "No message provided"}), 400
 
-    chat_history = json.load(open(chat_file)) if os.path.exists(chat_file) else []
-    chat_history.append({"role": "user", "message": user_message})
-    
-    ai_response = generate_user_chat_response(uuid, chat_history)
-    chat_history.append({"role": "ai", "message": ai_response})
-
-    with open(chat_file, "w") as f:
-        json.dump(chat_history, f, ensure_ascii=False, indent=2)
+    with chat_store.conversation_lock(uuid):
+        # Only the part of the log the reply needs is read
+        chat_history, start = load_chat_window(uuid, chats_dir)
+        chat_history.append({"role": "user", "message": user_message})
+        
+        ai_response = generate_user_chat_response(uuid, chat_history, start, chats_dir)
+        chat_store.append_messages(uuid, [
+            {"role": "user", "message": user_message},
+            {"role": "ai", "message": ai_response}
+        ], chats_dir)
 
     return jsonify({"response": ai_response})
+
+def _sse(event, payload):
+    return f"event: {event}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+@user_chat_bp.route("/<uuid>/stream", methods=["POST"])
+@stage_log(1)
+def user_chat_stream(uuid):
+    """Server-sent events variant of the POST above: `token` events, then one `done`."""
+    if not _is_valid_uuid(uuid):
+        return jsonify({"error": "Invalid or expired chat link."}), 404
+
+    data = request.get_json(silent=True) or {}
+    user_message = data.get("message", "").strip()
+    if not user_message:
+        return jsonify({"error": "No message provided"}), 400
+
+    chats_dir = get_chats_dir()
+
+    def generate():
+        # Held for the whole stream so a second message waits for this reply
+        with chat_store.conversation_lock(uuid):
+            chat_history, start = load_chat_window(uuid, chats_dir)
+            chat_history.append({"role": "user", "message": user_message})
+            parts = []
+            try:
+                for token in stream_user_chat_response(uuid, chat_history, start, chats_dir):
+                    parts.append(token)
+                    yield _sse("token", {"token": token})
+            except Exception as e:
+                yield _sse("error", {"error": str(e)})
+                return
+            ai_response = "".join(parts)
+            # Persist only once the whole reply has been produced
+            chat_store.append_messages(uuid, [
+                {"role": "user", "message": user_message},
+                {"role": "ai", "message": ai_response}
+            ], chats_dir)
+        yield _sse("done", {"response": ai_response})
+
+    return Response(stream_with_context(generate()), mimetype="text/event-stream",
+                    headers={"X-Accel-Buffering": "no"})
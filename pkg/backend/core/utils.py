@@ -1,10 +1,29 @@
 import os
 import shutil
+import threading
+import time
 import requests
 from bs4 import BeautifulSoup
 from langchain_core.documents import Document
 from logging_utils import stage_log
 
+class RateLimiter:
+    """Spaces calls out so that at most `per_minute` of them start per minute."""
+    def __init__(self, per_minute):
+        self.interval = 60.0 / per_minute if per_minute else 0.0
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            slot = max(time.monotonic(), self._next_slot)
+            self._next_slot = slot + self.interval
+        delay = slot - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
 stage_log(1)
 def ensure_data_dir(path):
     os.makedirs(path, exist_ok=True)
@@ -1,7 +1,11 @@
+import threading
 from langchain_core.documents import Document
 from langchain_chroma import Chroma
-from langchain_openai import AzureOpenAIEmbeddings
 from logging_utils import stage_log
+import metrics
+from core.settings import setup_llm_and_embeddings
+from core.chunker import chunk_content
+from core.embedding_writer import write_chunks
 import config
 
 PERSIST_DIRECTORY = 'data/chroma_store'
@@ -12,6 +16,15 @@ class FallbackEmbeddings:
     def embed_documents(self, texts):
         return [[0.0] * 384 for _ in texts]
 
+_fallback_embeddings = FallbackEmbeddings()
+
+# Process-wide company_info_store handle, reopened only when the embeddings client changes
+_company_collection = None
+_company_collection_embeddings = None
+_company_collection_lock = threading.Lock()
+# Bumped whenever the handle is reopened or its content changes, so callers can key caches on it
+_collection_version = 0
+
 stage_log(1)
 def get_azure_embeddings():
     endpoint = config.AZURE_OPENAI_ENDPOINT
@@ -19,54 +32,159 @@ def get_azure_embeddings():
     api_version = config.AZURE_OPENAI_API_VERSION
     api_key = config.AZURE_OPENAI_API_KEY
     if endpoint and deployment and api_version and api_key:
-        return AzureOpenAIEmbeddings(
-            azure_endpoint=endpoint,
-            azure_deployment=deployment,
-            openai_api_version=api_version,
-            api_key=api_key
-        )
+        return setup_llm_and_embeddings()[1]
     else:
-        return FallbackEmbeddings()
+        return _fallback_embeddings
 stage_log(2)
-def get_company_collection():
-    embeddings = get_azure_embeddings()
-    return Chroma(
-        collection_name="company_info_store",
-        persist_directory=PERSIST_DIRECTORY,
-        embedding_function=embeddings,
-        collection_metadata={"hnsw:space": "cosine"}
-    )
+def get_company_collection(embeddings=None):
+    """Return the shared company_info_store handle, opening it on first use."""
+    global _company_collection, _company_collection_embeddings, _collection_version
+    if embeddings is None:
+        embeddings = get_azure_embeddings()
+    collection = _company_collection
+    if collection is not None and _company_collection_embeddings is embeddings:
+        return collection
+    with _company_collection_lock:
+        if _company_collection is None or _company_collection_embeddings is not embeddings:
+            _company_collection = Chroma(
+                collection_name="company_info_store",
+                persist_directory=PERSIST_DIRECTORY,
+                embedding_function=embeddings,
+                collection_metadata={"hnsw:space": "cosine"}
+            )
+            _company_collection_embeddings = embeddings
+            _collection_version += 1
+        return _company_collection
+
+def get_collection_version():
+    return _collection_version
+
+def bump_collection_version():
+    global _collection_version
+    with _company_collection_lock:
+        _collection_version += 1
+
+def warmup_company_collection():
+    """Open the store and touch it once so the first request doesn't pay for it."""
+    try:
+        get_company_collection().get(limit=1)
+        return True
+    except Exception as e:
+        print(f"Warning: Could not warm up company collection: {e}")
+        return False
+
+def close_company_collection():
+    """Release the shared handle; the next get_company_collection reopens it."""
+    global _company_collection, _company_collection_embeddings
+    with _company_collection_lock:
+        _company_collection = None
+        _company_collection_embeddings = None
+
+def retrieve_company_chunks(collection, query_vector, k=4, fetch_k=20, lambda_mult=0.5, min_score=0.3):
+    """
+    Top-k company chunks for a query embedding, re-ranked with MMR so near
+    duplicates don't crowd out other products. Candidates below `min_score`
+    cosine similarity are dropped. Returns (Document, similarity) pairs in
+    rank order.
+    """
+    query_vector = list(query_vector)
+    with metrics.track('chroma', 'retrieve_company_chunks'):
+        # Scores for the candidate pool; company_info_store is cosine space, so similarity = 1 - distance
+        scored = collection.similarity_search_by_vector_with_relevance_scores(query_vector, k=fetch_k)
+        if not scored:
+            return []
+        # MMR order over the same pool, then the threshold, then the top k
+        ranked = collection.max_marginal_relevance_search_by_vector(
+            query_vector, k=fetch_k, fetch_k=fetch_k, lambda_mult=lambda_mult)
+    similarities = {doc.page_content: 1.0 - distance for doc, distance in scored}
+    results = []
+    for doc in ranked:
+        score = similarities.get(doc.page_content, 0.0)
+        if score >= min_score:
+            results.append((doc, score))
+            if len(results) == k:
+                break
+    return results
+
+def _stored_ids(collection, source_name):
+    return collection.get(where={"source_name": source_name}, include=[])["ids"]
+
+def _stored_vectors(collection, chunk_hashes):
+    """chunk_hash -> vector for chunks already stored with that text, from any source."""
+    if not chunk_hashes:
+        return {}
+    stored = collection.get(where={"chunk_hash": {"$in": sorted(chunk_hashes)}},
+                            include=["metadatas", "embeddings"])
+    vectors = {}
+    for metadata, vector in zip(stored["metadatas"] or [], stored["embeddings"] if stored["embeddings"] is not None else []):
+        chunk_hash = (metadata or {}).get("chunk_hash")
+        if chunk_hash:
+            vectors[chunk_hash] = vector
+    return vectors
+
 stage_log(2)
 def process_and_store_content(content, collection, source_type, source_name):
+    """
+    Chunk `content` (a markdown string or a list of page Documents) and store
+    each chunk under an ID derived from the source name and the chunk's own
+    text, so a chunk keeps its ID for as long as its text is unchanged and
+    no two sources ever share one.
+    Re-ingesting a source is incremental: unchanged chunks are left alone,
+    chunks whose text is already stored anywhere reuse that vector, only new
+    text is embedded, and this source's chunks that disappeared are deleted.
+    """
     import hashlib
-    content_hash = hashlib.sha256(str(content).encode()).hexdigest()
+    content_text = content if isinstance(content, str) else "\n".join(
+        getattr(page, "page_content", "") for page in content)
+    content_hash = hashlib.sha256(content_text.encode()).hexdigest()
+    source_key = hashlib.sha256(str(source_name).encode()).hexdigest()[:16]
     try:
-        existing_docs = collection.get(where={"content_hash": content_hash})
-        if not existing_docs['ids']:
-            chunk_ids = []
-            chunk_documents = []
-            for chunk in content:
-                if hasattr(chunk, "page_content"):
-                    metadata={
-                        "source_type": source_type,
-                        "source_name": source_name,
-                        "page_number": chunk.metadata.get("page_number", 1),
-                        "content_hash": content_hash
-                    }
-                    doc = Document(
-                        page_content=chunk.page_content,
-                        metadata=metadata
-                    )
-                    chunk_ids.append(f"{content_hash}_chunk_{chunk.metadata.get('page_number', 1)}")
-                    chunk_documents.append(doc)
-            collection.add_documents(
-                documents=chunk_documents,
-                ids=chunk_ids
+        stored_ids = set(_stored_ids(collection, source_name))
+        chunk_ids = []
+        chunk_documents = []
+        chunk_hashes = {}
+        occurrences = {}
+        for chunk in chunk_content(content):
+            chunk_hash = hashlib.sha256(chunk.page_content.encode()).hexdigest()
+            metadata={
+                "source_type": source_type,
+                "source_name": source_name,
+                "page_number": chunk.metadata.get("page_number", 1),
+                "section": chunk.metadata.get("section", ""),
+                "content_hash": content_hash,
+                "chunk_hash": chunk_hash
+            }
+            doc = Document(
+                page_content=chunk.page_content,
+                metadata=metadata
             )
-            return "success"
-        else:
+            # Repeated text within one source (e.g. a page footer) gets one ID per occurrence
+            occurrence = occurrences.get(chunk_hash, 0)
+            occurrences[chunk_hash] = occurrence + 1
+            chunk_id = f"{source_key}_{chunk_hash}_{occurrence}"
+            chunk_ids.append(chunk_id)
+            chunk_documents.append(doc)
+            chunk_hashes[chunk_id] = chunk_hash
+        if not chunk_documents:
+            return "error: no text to store"
+        new_hashes = {chunk_hashes[chunk_id] for chunk_id in chunk_ids if chunk_id not in stored_ids}
+        stored_vectors = _stored_vectors(collection, new_hashes)
+        known_vectors = {chunk_id: stored_vectors[chunk_hash]
+                         for chunk_id, chunk_hash in chunk_hashes.items() if chunk_hash in stored_vectors}
+        # Chunks already stored (unchanged, or from a half-finished earlier upload) are skipped
+        result = write_chunks(collection, chunk_ids, chunk_documents, known_vectors=known_vectors)
+        # Drop the previous version only once the new one is fully stored
+        stale_ids = sorted(stored_ids - set(chunk_ids))
+        if stale_ids:
+            with metrics.track('chroma', 'delete'):
+                collection.delete(ids=stale_ids)
+        if not result['written'] and not stale_ids:
             return "file_exists"
+        bump_collection_version()
+        return "success"
     except Exception as e:
+        # Batches committed before the failure are kept; a retry resumes after them
+        bump_collection_version()
         return f"error: {str(e)}"
 
 stage_log(3)
@@ -76,6 +194,7 @@ def clear_company_collection():
         company_ids = collection.get()['ids']
         if company_ids:
             collection.delete(ids=company_ids)
+            bump_collection_version()
         return True
     except Exception:
         return False 
\ No newline at end of file
@@ -1,8 +1,12 @@
+import os
+import json
 import time
+import random
+import reprlib
 import functools
 import inspect
-import traceback
 import logging
+import metrics
 
 
 logging.basicConfig(
@@ -15,6 +19,7 @@ logging.basicConfig(
 )
 
 logger = logging.getLogger("admin_app")
+logger.setLevel(os.environ.get("STAGE_LOG_LEVEL", "INFO").upper())
 
 STAGE_NAMES = {
     1: "STAGE 1 (CRITICAL)",
@@ -23,42 +28,106 @@ STAGE_NAMES = {
     4: "STAGE 4 (OPTIONAL)"
 }
 
+# Level each stage's timing records are emitted at; errors are always logged at ERROR
+STAGE_LEVELS = {
+    1: logging.INFO,
+    2: logging.INFO,
+    3: logging.DEBUG,
+    4: logging.DEBUG
+}
+
+# Fraction of successful calls per stage that get a record; errors are never sampled out
+STAGE_SAMPLE_RATES = {
+    1: 1.0,
+    2: 1.0,
+    3: 0.1,
+    4: 0.01
+}
+
+# Longest rendering of any single argument or return value in a record
+REPR_LIMIT = 200
+
+_repr = reprlib.Repr()
+_repr.maxstring = REPR_LIMIT
+_repr.maxother = REPR_LIMIT
+_repr.maxlist = _repr.maxtuple = _repr.maxdict = _repr.maxset = 5
+
+
+def set_stage_level(stage, level):
+    STAGE_LEVELS[stage] = level
+
+
+def set_stage_sample_rate(stage, rate):
+    STAGE_SAMPLE_RATES[stage] = rate
+
+
+def short_repr(value):
+    """Bounded rendering that never formats a whole DataFrame or document."""
+    shape = getattr(value, "shape", None)
+    if shape is not None and not isinstance(value, (str, bytes)):
+        return f"<{type(value).__name__} shape={tuple(shape)}>"
+    content = getattr(value, "page_content", None) or getattr(value, "content", None)
+    if isinstance(content, str):
+        return f"<{type(value).__name__} {_repr.repr(content)}>"
+    try:
+        text = _repr.repr(value)
+    except Exception:
+        text = f"<{type(value).__name__}>"
+    return text if len(text) <= REPR_LIMIT else text[:REPR_LIMIT] + "..."
+
+
+def _describe_args(sig, args, kwargs):
+    try:
+        bound = sig.bind_partial(*args, **kwargs)
+        items = bound.arguments.items()
+    except Exception:
+        items = list(enumerate(args)) + list(kwargs.items())
+    return {str(name): short_repr(value) for name, value in items}
+
+
+def _emit(level, record, exc_info=False):
+    logger.log(level, json.dumps(record, default=str), exc_info=exc_info, extra={"stage_record": record})
+
+
 def stage_log(stage=2):
     def decorator(func):
+        func_name = func.__qualname__
+        try:
+            sig = inspect.signature(func)
+        except (TypeError, ValueError):
+            sig = None
+
         @functools.wraps(func)
         def wrapper(*args, **kwargs):
-            start = time.time()
-            result = None
+            start = time.perf_counter()
             try:
                 result = func(*args, **kwargs)
-                return result
             except Exception as e:
-                error_msg = f"Error in {func.__qualname__}: {str(e)}"
-                error_traceback = traceback.format_exc()
-                logger.error(f"{error_msg}\n{error_traceback}")
-                print(f"[ERROR] {error_msg}")
+                elapsed = time.perf_counter() - start
+                metrics.observe("function", func_name, elapsed, error=True)
+                if logger.isEnabledFor(logging.ERROR):
+                    _emit(logging.ERROR, {
+                        "stage": STAGE_NAMES.get(stage, "STAGE ?"),
+                        "func": func_name,
+                        "status": "error",
+                        "elapsed_ms": round(elapsed * 1000, 3),
+                        "error": f"{type(e).__name__}: {str(e)[:REPR_LIMIT]}",
+                        "args": _describe_args(sig, args, kwargs) if sig else None
+                    }, exc_info=True)
                 raise
-            finally:
-                elapsed = time.time() - start
-                func_name = func.__qualname__
-                try:
-                    sig = inspect.signature(func)
-                    bound = sig.bind_partial(*args, **kwargs)
-                    bound.apply_defaults()
-                    arg_dict = dict(bound.arguments)
-                except Exception:
-                    arg_dict = {"args": args, "kwargs": kwargs}
-                
-                log_message = (
-                    f"[{STAGE_NAMES.get(stage, 'STAGE ?')}] "
-                    f"Function: {func_name}\n"
-                    f"  Input: {arg_dict}\n"
-                    f"  Output: {result}\n"
-                    f"  Time: {elapsed:.4f}s\n"
-                    f"{'-'*40}"
-                )
-                
-                print(log_message)
-                logger.info(log_message)
+            elapsed = time.perf_counter() - start
+            metrics.observe("function", func_name, elapsed)
+            level = STAGE_LEVELS.get(stage, logging.DEBUG)
+            rate = STAGE_SAMPLE_RATES.get(stage, 1.0)
+            if logger.isEnabledFor(level) and (rate >= 1.0 or random.random() < rate):
+                _emit(level, {
+                    "stage": STAGE_NAMES.get(stage, "STAGE ?"),
+                    "func": func_name,
+                    "status": "ok",
+                    "elapsed_ms": round(elapsed * 1000, 3),
+                    "args": _describe_args(sig, args, kwargs) if sig else None,
+                    "result": short_repr(result)
+                })
+            return result
         return wrapper
     return decorator
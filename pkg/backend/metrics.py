@@ -0,0 +1,128 @@
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+# Upper bounds in seconds; the last bucket is +Inf
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, float("inf"))
+QUANTILES = (0.5, 0.95, 0.99)
+# Quantiles are computed over this many most recent samples per series
+RESERVOIR_SIZE = 1024
+METRIC_PREFIX = "bizcon"
+
+
+class LatencyHistogram:
+    def __init__(self):
+        self.bucket_counts = [0] * len(BUCKETS)
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.recent = deque(maxlen=RESERVOIR_SIZE)
+
+    def observe(self, seconds, error=False):
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                self.bucket_counts[i] += 1
+                break
+        self.count += 1
+        self.total += seconds
+        if error:
+            self.errors += 1
+        self.recent.append(seconds)
+
+    def quantiles(self):
+        samples = sorted(self.recent)
+        if not samples:
+            return {q: 0.0 for q in QUANTILES}
+        return {q: samples[min(len(samples) - 1, int(q * len(samples)))] for q in QUANTILES}
+
+
+_histograms = {}
+_lock = threading.Lock()
+
+
+def observe(kind, name, seconds, error=False):
+    """Record one call. `kind` separates function timings from llm/embedding/smtp/chroma calls."""
+    key = (kind, name)
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = LatencyHistogram()
+        histogram.observe(seconds, error)
+
+
+@contextmanager
+def track(kind, name):
+    """Time the enclosed block under (kind, name); exceptions count as errors and propagate."""
+    start = time.perf_counter()
+    error = False
+    try:
+        yield
+    except Exception:
+        error = True
+        raise
+    finally:
+        observe(kind, name, time.perf_counter() - start, error)
+
+
+def reset():
+    with _lock:
+        _histograms.clear()
+
+
+def _labels(kind, name, **extra):
+    pairs = [("kind", kind), ("name", name)] + list(extra.items())
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+def _format_bound(bound):
+    return "+Inf" if bound == float("inf") else repr(bound)
+
+
+def render_prometheus():
+    """Render every series in the Prometheus text exposition format."""
+    with _lock:
+        snapshot = [(key, h.bucket_counts[:], h.count, h.errors, h.total, h.quantiles())
+                    for key, h in sorted(_histograms.items())]
+
+    duration = f"{METRIC_PREFIX}_call_duration_seconds"
+    latency = f"{METRIC_PREFIX}_call_latency_seconds"
+    errors = f"{METRIC_PREFIX}_call_errors_total"
+    error_ratio = f"{METRIC_PREFIX}_call_error_ratio"
+    lines = [
+        f"# HELP {duration} Latency of instrumented calls.",
+        f"# TYPE {duration} histogram",
+    ]
+    for (kind, name), bucket_counts, count, _, total, _ in snapshot:
+        cumulative = 0
+        for bound, bucket_count in zip(BUCKETS, bucket_counts):
+            cumulative += bucket_count
+            lines.append(f"{duration}_bucket{_labels(kind, name, le=_format_bound(bound))} {cumulative}")
+        lines.append(f"{duration}_sum{_labels(kind, name)} {total}")
+        lines.append(f"{duration}_count{_labels(kind, name)} {count}")
+
+    lines += [
+        f"# HELP {latency} Latency quantiles over the most recent {RESERVOIR_SIZE} calls.",
+        f"# TYPE {latency} summary",
+    ]
+    for (kind, name), _, count, _, total, quantiles in snapshot:
+        for q, value in quantiles.items():
+            lines.append(f"{latency}{_labels(kind, name, quantile=q)} {value}")
+        lines.append(f"{latency}_sum{_labels(kind, name)} {total}")
+        lines.append(f"{latency}_count{_labels(kind, name)} {count}")
+
+    lines += [
+        f"# HELP {errors} Instrumented calls that raised.",
+        f"# TYPE {errors} counter",
+    ]
+    for (kind, name), _, _, error_count, _, _ in snapshot:
+        lines.append(f"{errors}{_labels(kind, name)} {error_count}")
+
+    lines += [
+        f"# HELP {error_ratio} Share of instrumented calls that raised.",
+        f"# TYPE {error_ratio} gauge",
+    ]
+    for (kind, name), _, count, error_count, _, _ in snapshot:
+        lines.append(f"{error_ratio}{_labels(kind, name)} {error_count / count if count else 0.0}")
+    return "\n".join(lines) + "\n"
@@ -129,9 +129,22 @@ function CompanyInfoSettings() {
       if (!res.ok) {
         throw new Error(data.error || 'Upload failed');
       }
+      // Files are converted and embedded in a background job; poll until it finishes
+      let job = { status: data.status };
+      while (job.status === 'queued' || job.status === 'running') {
+        await new Promise((resolve) => setTimeout(resolve, 2000));
+        const jobRes = await fetch(`/api/jobs/${data.job_id}`);
+        if (!jobRes.ok) {
+          throw new Error(`HTTP error! status: ${jobRes.status}`);
+        }
+        job = await jobRes.json();
+      }
+      if (!job.result) {
+        throw new Error(job.error || `Upload job ${job.status}`);
+      }
       // Show success message with details
-      const successCount = data.results?.filter(r => r.status === 'success').length || 0;
-      const errorCount = data.results?.filter(r => r.status === 'error').length || 0;
+      const successCount = job.result.results?.filter(r => r.status === 'success').length || 0;
+      const errorCount = job.result.results?.filter(r => r.status === 'error').length || 0;
       let message = `Successfully processed ${successCount} file${successCount !== 1 ? 's' : ''}`;
       if (errorCount > 0) {
         message += ` (${errorCount} file${errorCount !== 1 ? 's' : ''} failed)`;
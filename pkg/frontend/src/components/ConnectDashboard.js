@@ -170,6 +170,24 @@ const styles = {
   },
 };
 
+// Leads are fetched one source and one page at a time
+const PAGE_SIZE = 100;
+
+const fetchJson = (url) =>
+  fetch(url).then((res) => {
+    if (!res.ok) {
+      throw new Error(`HTTP error! status: ${res.status}`);
+    }
+    return res.text().then(text => {
+      try {
+        return JSON.parse(text) || {}; // Ensure we always return an object
+      } catch (e) {
+        console.error('Failed to parse response:', text);
+        throw new Error('Invalid JSON response from server');
+      }
+    });
+  });
+
 const getStatusColorByCount = (lead) => {
   if ((lead.email_count || 0) > 0)
     return { bg: "#4CAF50", color: "#fff" }; // Green
@@ -182,7 +200,10 @@ const getStatusText = (lead) => {
 };
 
 export default function ConnectDashboard() {
+  const [sources, setSources] = useState([]);
   const [leadsBySource, setLeadsBySource] = useState({});
+  const [nextCursors, setNextCursors] = useState({});
+  const [loadingSources, setLoadingSources] = useState({});
   const [selected, setSelected] = useState({});
   const [sending, setSending] = useState(false);
   const [result, setResult] = useState(null);
@@ -193,24 +214,11 @@ export default function ConnectDashboard() {
   const [error, setError] = useState(null);
   const [successMessage, setSuccessMessage] = useState(null);
 
+  // Only per-source counts up front; a source's leads load when it is expanded
   useEffect(() => {
-    fetch("/api/leads")
-      .then((res) => {
-        if (!res.ok) {
-          throw new Error(`HTTP error! status: ${res.status}`);
-        }
-        return res.text().then(text => {
-          try {
-            const data = JSON.parse(text);
-            return data || {}; // Ensure we always return an object
-          } catch (e) {
-            console.error('Failed to parse response:', text);
-            throw new Error('Invalid JSON response from server');
-          }
-        });
-      })
+    fetchJson("/api/leads/summary")
       .then((data) => {
-        setLeadsBySource(data);
+        setSources(data.sources || []);
         setLoading(false);
       })
       .catch((err) => {
@@ -228,37 +236,54 @@ export default function ConnectDashboard() {
     }
   }, [successMessage]);
 
-  // Check if leads are present
-  const hasLeads = Object.keys(leadsBySource).length > 0 &&
-    Object.values(leadsBySource).some(arr => arr && arr.length > 0);
-
-  const searchableFields = ["name", "email", "company", "phone", "position"];
-
-  const searchMatch = (lead, term) => {
-    if (!term) return false;
-    const searchTerms = term.toLowerCase().split(' ');
-    return searchTerms.every(searchTerm =>
-      searchableFields.some(
-        field => lead[field] && String(lead[field]).toLowerCase().includes(searchTerm)
-      )
-    );
+  const loadLeads = (source, cursor = null) => {
+    const params = new URLSearchParams({ source, limit: PAGE_SIZE });
+    if (cursor) params.set("cursor", cursor);
+    setLoadingSources(prev => ({ ...prev, [source]: true }));
+    fetchJson(`/api/leads?${params}`)
+      .then((data) => {
+        setLeadsBySource(prev => ({
+          ...prev,
+          [source]: [...(cursor ? prev[source] || [] : []), ...(data.leads || [])]
+        }));
+        setNextCursors(prev => ({ ...prev, [source]: data.next_cursor }));
+      })
+      .catch((err) => {
+        console.error("Failed to load leads:", err);
+        setError(err.message);
+      })
+      .finally(() => setLoadingSources(prev => ({ ...prev, [source]: false })));
   };
 
+  // Search runs on the server so it covers leads that haven't been loaded yet
   useEffect(() => {
-    if (!searchTerm.trim()) {
+    const term = searchTerm.trim();
+    if (!term) {
       setSearchResults([]);
       return;
     }
-
-    const results = Object.entries(leadsBySource).flatMap(([source, leads]) =>
-      leads
-        .filter(lead => searchMatch(lead, searchTerm.trim()))
-        .map(lead => ({ ...lead, source }))
-    );
-    setSearchResults(results);
-  }, [leadsBySource, searchTerm]);
+    let cancelled = false;
+    const timer = setTimeout(() => {
+      const params = new URLSearchParams({ search: term, limit: PAGE_SIZE });
+      fetchJson(`/api/leads?${params}`)
+        .then((data) => {
+          if (!cancelled) setSearchResults(data.leads || []);
+        })
+        .catch((err) => {
+          console.error("Failed to search leads:", err);
+          if (!cancelled) setError(err.message);
+        });
+    }, 300);
+    return () => {
+      cancelled = true;
+      clearTimeout(timer);
+    };
+  }, [searchTerm]);
 
   const toggleSourceExpand = (source) => {
+    if (!expandedSources[source] && !leadsBySource[source] && !loadingSources[source]) {
+      loadLeads(source);
+    }
     setExpandedSources(prev => ({
       ...prev,
       [source]: !prev[source]
@@ -338,9 +363,23 @@ export default function ConnectDashboard() {
         throw new Error('Invalid JSON response from server');
       }
 
-      setResult(data);
+      // The campaign runs as a background job; poll until it finishes
+      let job = { status: data.status };
+      while (job.status === "queued" || job.status === "running") {
+        await new Promise((resolve) => setTimeout(resolve, 2000));
+        const jobRes = await fetch(`/api/jobs/${data.job_id}`);
+        if (!jobRes.ok) {
+          throw new Error(`HTTP error! status: ${jobRes.status}`);
+        }
+        job = await jobRes.json();
+      }
+      if (!job.result) {
+        throw new Error(job.error || `Email job ${job.status}`);
+      }
+
+      setResult(job.result);
       setSelected({}); // Clear selections after successful send
-      setSuccessMessage("Emails sent successfully!");
+      setSuccessMessage(job.result.success ? "Emails sent successfully!" : null);
     } catch (err) {
       console.error('Failed to send emails:', err);
       setError(err.message || 'Failed to send emails');
@@ -350,8 +389,7 @@ export default function ConnectDashboard() {
   };
 
   // Helper: Check if leads are present
-  const leadsPresent = Object.keys(leadsBySource || {}).length > 0 &&
-    Object.values(leadsBySource || {}).some(arr => Array.isArray(arr) && arr.length > 0);
+  const leadsPresent = sources.some(({ total }) => total > 0);
 
   return (
     <div style={styles.container}>
@@ -466,12 +504,12 @@ export default function ConnectDashboard() {
       {/* Show original source-based view when not searching */}
       {!loading && !error && !searchTerm.trim() && leadsPresent && (
         <>
-          {Object.entries(leadsBySource || {}).map(([source, leads]) => (
+          {sources.map(({ source, total }) => (
             <div key={source}>
               <div style={styles.card} onClick={() => toggleSourceExpand(source)}>
                 <div style={styles.headerLine}>
                   <div style={styles.headerTitle}>{source}</div>
-                  <div style={styles.headerCount}>{leads.length} Leads</div>
+                  <div style={styles.headerCount}>{total} Leads</div>
                 </div>
               </div>
 
@@ -509,7 +547,7 @@ export default function ConnectDashboard() {
                   </div>
 
                   {/* rows */}
-                  {leads.map((lead) => (
+                  {(leadsBySource[source] || []).map((lead) => (
                     <div key={lead.id} style={styles.tableRow}>
                       <div style={styles.tableCell}>
                         <input
@@ -539,6 +577,21 @@ export default function ConnectDashboard() {
                       <div style={styles.tableCellCenter}>{lead.email_count || 0}</div>
                     </div>
                   ))}
+
+                  {loadingSources[source] && (
+                    <p style={{ textAlign: 'center' }}>Loading leads...</p>
+                  )}
+                  {!loadingSources[source] && nextCursors[source] && (
+                    <button
+                      style={styles.actionButton}
+                      onClick={(e) => {
+                        e.stopPropagation();
+                        loadLeads(source, nextCursors[source]);
+                      }}
+                    >
+                      Load More
+                    </button>
+                  )}
                 </div>
               )}
             </div>
@@ -221,19 +221,55 @@ function UserChat() {
     setIsLoading(true);
     
     try {
-      const res = await fetch(`/api/user_chat/${uuid}`, {
+      const res = await fetch(`/api/user_chat/${uuid}/stream`, {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
         body: JSON.stringify({ message: currentInput })
       });
-      const data = await res.json();
-      if (data.error) {
-        setError(data.error);
-      } else {
-        setMessages(msgs => [...msgs, { role: 'ai', message: data.response }]);
-        // Check if the AI response contains the ending phrase
-        if (data.response.toLowerCase().includes('have a great day')) {
-          setIsChatEnded(true);
+      if (!res.ok || !res.body) {
+        const data = await res.json();
+        setError(data.error || 'Failed to send message');
+        return;
+      }
+
+      // Show tokens as they arrive; the server sends `token` events, then `done` or `error`
+      setMessages(msgs => [...msgs, { role: 'ai', message: '' }]);
+      const appendToReply = (text, replace = false) => {
+        setMessages(msgs => {
+          const last = msgs[msgs.length - 1];
+          return [...msgs.slice(0, -1), { ...last, message: replace ? text : last.message + text }];
+        });
+      };
+      const reader = res.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = '';
+      let streaming = true;
+      while (streaming) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        const events = buffer.split('\n\n');
+        buffer = events.pop();
+        for (const raw of events) {
+          const event = (raw.match(/^event: (.*)$/m) || [])[1];
+          const dataLine = (raw.match(/^data: (.*)$/m) || [])[1];
+          if (!dataLine) continue;
+          const data = JSON.parse(dataLine);
+          if (event === 'token') {
+            setIsLoading(false);
+            appendToReply(data.token);
+          } else if (event === 'done') {
+            appendToReply(data.response, true);
+            // Check if the AI response contains the ending phrase
+            if (data.response.toLowerCase().includes('have a great day')) {
+              setIsChatEnded(true);
+            }
+            streaming = false;
+          } else if (event === 'error') {
+            setMessages(msgs => (msgs[msgs.length - 1].message ? msgs : msgs.slice(0, -1)));
+            setError(data.error);
+            streaming = false;
+          }
         }
       }
     } catch (e) {